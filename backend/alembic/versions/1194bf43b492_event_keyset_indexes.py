@@ -0,0 +1,25 @@
+"""event keyset indexes
+
+Revision ID: 1194bf43b492
+Revises: 0c882e751079
+Create Date: 2026-10-19 10:12:31.208113
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '1194bf43b492'
+down_revision = '0c882e751079'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_index('event_server_type_id', 'events', ['server_id', 'type', 'id'], unique=False)
+    op.create_index('event_channel_type_id', 'events', ['channel_id', 'type', 'id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('event_channel_type_id', table_name='events')
+    op.drop_index('event_server_type_id', table_name='events')
@@ -0,0 +1,26 @@
+"""message search
+
+Revision ID: 5e0d3a8c71f4
+Revises: 716c1139fa2b
+Create Date: 2026-10-19 11:48:05.113270
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = '5e0d3a8c71f4'
+down_revision = '716c1139fa2b'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.add_column('messages', sa.Column('search_vector', postgresql.TSVECTOR(), nullable=True))
+    op.execute("UPDATE messages SET search_vector = to_tsvector('simple', message)")
+    op.create_index('message_search', 'messages', ['search_vector'], unique=False, postgresql_using='gin')
+
+
+def downgrade():
+    op.drop_index('message_search', table_name='messages')
+    op.drop_column('messages', 'search_vector')
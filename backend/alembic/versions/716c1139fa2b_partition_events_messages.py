@@ -0,0 +1,137 @@
+"""partition events and messages by month
+
+Revision ID: 716c1139fa2b
+Revises: 1194bf43b492
+Create Date: 2026-10-19 11:02:47.530912
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '716c1139fa2b'
+down_revision = '1194bf43b492'
+branch_labels = None
+depends_on = None
+
+# Creation time of a message from its snowflake, the partition key has to be derivable from the message ID.
+SNOWFLAKE_TIME = "(timestamp 'epoch' + ((message_id >> 22) + 1420070400000) * interval '1 millisecond')"
+
+EVENT_COLUMNS = "id, server_id, channel_id, posted, type, data"
+MESSAGE_COLUMNS = "id, message_id, server_id, channel_id, author_id, pinned, tts, attachments, reactions, embeds, " \
+                  "created, edited, message"
+
+
+def create_events(partition_by=None):
+    op.execute(f"""
+        CREATE TABLE events (
+            id INTEGER NOT NULL DEFAULT nextval('events_id_seq'),
+            server_id INTEGER NOT NULL REFERENCES servers (id),
+            channel_id INTEGER REFERENCES channels (id),
+            posted TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+            type VARCHAR(32) NOT NULL,
+            data JSONB NOT NULL,
+            PRIMARY KEY ({"id, posted" if partition_by else "id"})
+        ) {f"PARTITION BY RANGE ({partition_by})" if partition_by else ""}
+    """)
+
+
+def create_messages(partition_by=None):
+    op.execute(f"""
+        CREATE TABLE messages (
+            id INTEGER NOT NULL DEFAULT nextval('messages_id_seq'),
+            message_id BIGINT NOT NULL,
+            server_id INTEGER NOT NULL REFERENCES servers (id),
+            channel_id INTEGER NOT NULL REFERENCES channels (id),
+            author_id BIGINT NOT NULL,
+            pinned BOOLEAN DEFAULT 'f',
+            tts BOOLEAN DEFAULT 'f',
+            attachments JSONB,
+            reactions JSONB,
+            embeds JSONB,
+            created TIMESTAMP WITHOUT TIME ZONE {"NOT NULL" if partition_by else ""},
+            edited TIMESTAMP WITHOUT TIME ZONE,
+            message VARCHAR NOT NULL,
+            PRIMARY KEY ({"id, created" if partition_by else "id"}),
+            UNIQUE ({"message_id, created" if partition_by else "message_id"})
+        ) {f"PARTITION BY RANGE ({partition_by})" if partition_by else ""}
+    """)
+
+
+def create_partitions(table, first):
+    # One partition per month from the oldest row up to three months ahead, the rest lands in the default.
+    op.execute(f"""
+        DO $$
+        DECLARE
+            month DATE;
+        BEGIN
+            FOR month IN SELECT generate_series(
+                date_trunc('month', COALESCE(({first}), now())),
+                date_trunc('month', now()) + interval '3 months',
+                interval '1 month'
+            )::date LOOP
+                EXECUTE format(
+                    'CREATE TABLE %I PARTITION OF {table} FOR VALUES FROM (%L) TO (%L)',
+                    '{table}_' || to_char(month, '"y"YYYY"m"MM'),
+                    month,
+                    month + interval '1 month'
+                );
+            END LOOP;
+        END $$
+    """)
+    op.execute(f"CREATE TABLE {table}_default PARTITION OF {table} DEFAULT")
+
+
+def replace_table(table):
+    op.execute(f"ALTER TABLE {table} RENAME TO {table}_old")
+    op.execute(f"ALTER TABLE {table}_old RENAME CONSTRAINT {table}_pkey TO {table}_old_pkey")
+    # The sequence would otherwise be dropped together with the old table.
+    op.execute(f"ALTER SEQUENCE {table}_id_seq OWNED BY NONE")
+
+
+def finish_table(table):
+    op.execute(f"DROP TABLE {table}_old")
+    op.execute(f"ALTER SEQUENCE {table}_id_seq OWNED BY {table}.id")
+
+
+def upgrade():
+    op.drop_index('event_channel_type_id', table_name='events')
+    op.drop_index('event_server_type_id', table_name='events')
+
+    replace_table("events")
+    create_events(partition_by="posted")
+    create_partitions("events", "SELECT min(posted) FROM events_old")
+    op.execute(f"INSERT INTO events ({EVENT_COLUMNS}) SELECT {EVENT_COLUMNS} FROM events_old")
+    finish_table("events")
+
+    replace_table("messages")
+    create_messages(partition_by="created")
+    create_partitions("messages", f"SELECT {SNOWFLAKE_TIME} FROM messages_old ORDER BY message_id LIMIT 1")
+    op.execute(f"""
+        INSERT INTO messages ({MESSAGE_COLUMNS})
+        SELECT {MESSAGE_COLUMNS.replace("created", SNOWFLAKE_TIME)} FROM messages_old
+    """)
+    finish_table("messages")
+
+    # Indexes on the parent are created on every partition, and on partitions added later.
+    op.create_index('event_server_type_id', 'events', ['server_id', 'type', 'id'], unique=False)
+    op.create_index('event_channel_type_id', 'events', ['channel_id', 'type', 'id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('event_channel_type_id', table_name='events')
+    op.drop_index('event_server_type_id', table_name='events')
+
+    replace_table("events")
+    create_events()
+    op.execute(f"INSERT INTO events ({EVENT_COLUMNS}) SELECT {EVENT_COLUMNS} FROM events_old")
+    finish_table("events")
+
+    replace_table("messages")
+    create_messages()
+    op.execute(f"INSERT INTO messages ({MESSAGE_COLUMNS}) SELECT {MESSAGE_COLUMNS} FROM messages_old")
+    finish_table("messages")
+
+    op.create_index('event_server_type_id', 'events', ['server_id', 'type', 'id'], unique=False)
+    op.create_index('event_channel_type_id', 'events', ['channel_id', 'type', 'id'], unique=False)
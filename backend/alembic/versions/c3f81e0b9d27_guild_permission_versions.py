@@ -0,0 +1,27 @@
+"""guild permission versions
+
+Revision ID: c3f81e0b9d27
+Revises: 5e0d3a8c71f4
+Create Date: 2026-10-19 12:31:52.774310
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c3f81e0b9d27'
+down_revision = '5e0d3a8c71f4'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.add_column('servers', sa.Column('permissions_version', sa.Integer(), server_default='0', nullable=False))
+    op.create_index('permission_server_channel', 'permissions', ['server_id', 'channel_id'], unique=False)
+    op.drop_index('permission_server', table_name='permissions')
+
+
+def downgrade():
+    op.create_index('permission_server', 'permissions', ['server_id'], unique=False)
+    op.drop_index('permission_server_channel', table_name='permissions')
+    op.drop_column('servers', 'permissions_version')
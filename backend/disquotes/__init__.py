@@ -5,6 +5,8 @@ import os
 from flask import Flask
 from raven.contrib.flask import Sentry
 
+from disquotes.lib import partitions
+from disquotes.model import engine
 from disquotes.model.auth import discord
 from disquotes.model.handlers import (before_request, commit_sql, connect_redis, connect_sql, disconnect_redis,
                                       disconnect_sql)
@@ -45,3 +47,12 @@ app.teardown_request(disconnect_redis)
 app.register_blueprint(frontend.blueprint)
 app.register_blueprint(discord, url_prefix="/auth")
 app.register_blueprint(api.blueprint, url_prefix="/api")
+
+# Commands
+
+
+@app.cli.command("partitions")
+def maintain_partitions():
+    """Creates upcoming monthly partitions and drops expired ones."""
+    with engine.begin() as connection:
+        partitions.maintain(connection)
@@ -0,0 +1,57 @@
+# coding=utf-8
+"""
+Asyncio serving mode for the internal bot API.
+
+Serves the events and permissions namespaces with the same routes and payloads as the Flask app, on aiohttp
+with a pooled asyncpg connection instead of a SQLAlchemy session per request. Statements and payloads come from
+disquotes.lib, which the Flask namespaces use too. Run it with
+`gunicorn disquotes.aio:app -k aiohttp.GunicornWebWorker` and point the bot's BOT_API at it.
+"""
+import json
+import os
+
+import asyncpg
+from aiohttp import web
+
+from disquotes.aio import events, permissions
+from disquotes.aio.base import error_middleware
+from disquotes.lib.resolver import AsyncIDResolver
+
+
+def get_dsn() -> str:
+    # asyncpg does not understand SQLAlchemy driver suffixes like postgresql+psycopg2://.
+    scheme, rest = os.environ["POSTGRES_URL"].split("://", 1)
+    return scheme.split("+", 1)[0] + "://" + rest
+
+
+async def init_connection(connection):
+    for jsontype in ("json", "jsonb"):
+        await connection.set_type_codec(jsontype, encoder=json.dumps, decoder=json.loads, schema="pg_catalog")
+
+
+async def create_pool(app):
+    app["pool"] = await asyncpg.create_pool(
+        get_dsn(),
+        min_size=int(os.environ.get("POSTGRES_POOL_MIN", 2)),
+        max_size=int(os.environ.get("POSTGRES_POOL_MAX", 20)),
+        init=init_connection
+    )
+    app["resolver"] = AsyncIDResolver(app["pool"])
+
+
+async def close_pool(app):
+    await app["pool"].close()
+
+
+def create_app() -> web.Application:
+    application = web.Application(middlewares=[error_middleware])
+    application.add_routes(events.routes)
+    application.add_routes(permissions.routes)
+
+    application.on_startup.append(create_pool)
+    application.on_cleanup.append(close_pool)
+
+    return application
+
+
+app = create_app()
@@ -0,0 +1,126 @@
+# coding=utf-8
+import datetime
+import json
+import logging
+from typing import Optional, Tuple
+
+from aiohttp import web
+from sqlalchemy.sql.elements import TextClause
+
+from disquotes.lib.sql import positional
+
+log = logging.getLogger(__name__)
+
+
+class APIError(Exception):
+    def __init__(self, code: int, message: str):
+        super().__init__(message)
+        self.code = code
+        self.message = message
+
+
+def abort(code: int, message: str):
+    raise APIError(code, message)
+
+
+@web.middleware
+async def error_middleware(request, handler):
+    """Replies to errors with the same payload as the Flask API's default error handler."""
+    try:
+        return await handler(request)
+    except APIError as e:
+        return web.json_response({"message": e.message}, status=e.code)
+    except web.HTTPException:
+        raise
+    except Exception as e:
+        log.exception("Error handling %s %s", request.method, request.path)
+        return web.json_response({"message": str(e)}, status=500)
+
+
+async def get_fields(request: web.Request) -> dict:
+    """
+    Gets the fields of a request, mirroring ResourceBase.get_field.
+
+    JSON body fields take precedence over form fields, which take precedence over query string arguments.
+    """
+    fields = dict(request.query)
+
+    if request.content_type == "application/json":
+        try:
+            fields.update(await request.json())
+        except ValueError:
+            abort(400, "Invalid JSON body.")
+    elif request.can_read_body:
+        fields.update(await request.post())
+
+    return fields
+
+
+def get_field(fields: dict, field: str, default=None, asjson: bool=False):
+    content = fields.get(field)
+
+    if not content:
+        return default
+
+    if asjson and isinstance(content, str):
+        try:
+            return json.loads(content)
+        except ValueError:
+            abort(400, f"Field `{field}` is not valid JSON.")
+
+    return content
+
+
+def get_timestamp(fields: dict, field: str) -> Optional[datetime.datetime]:
+    try:
+        return datetime.datetime.utcfromtimestamp(int(get_field(fields, field)))
+    except (ValueError, TypeError, OverflowError, OSError):
+        return None
+
+
+async def fetch(connection, statement: TextClause, params: dict) -> list:
+    """Runs one of the shared text() statements on an asyncpg connection and gets its rows."""
+    sql, args = positional(statement, params)
+    return await connection.fetch(sql, *args)
+
+
+async def execute(connection, statement: TextClause, params: dict):
+    sql, args = positional(statement, params)
+    await connection.execute(sql, *args)
+
+
+async def get_server_channel(
+    resolver,
+    fields: dict,
+    create: bool=False,
+    **kwargs
+) -> Tuple[Optional[int], Optional[int]]:
+    """
+    Resolves Discord server and channel IDs to the IDs of their rows, mirroring ResourceBase.get_server_channel.
+
+    :param resolver: The app's AsyncIDResolver.
+    :return: A tuple of the server row ID and the channel row ID, the latter None when no channel was given.
+    """
+    try:
+        server_id = int(kwargs.get("server", get_field(fields, "server", 0)))
+    except (TypeError, ValueError):
+        server_id = 0
+
+    if server_id == 0:
+        abort(400, "Server ID field is blank.")
+
+    try:
+        channel_id = int(kwargs.get("channel", get_field(fields, "channel", 0)))
+    except (TypeError, ValueError):
+        channel_id = None
+
+    server = (await resolver.servers([server_id], create=create)).get(server_id)
+    if not server:
+        abort(400, "A server object could not be found.")
+
+    if not channel_id:
+        return server, None
+
+    _, channel = (await resolver.channels({channel_id: server_id}, create=create)).get(channel_id, (None, None))
+
+    return server, channel
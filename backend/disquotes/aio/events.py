@@ -0,0 +1,107 @@
+# coding=utf-8
+from aiohttp import web
+
+from disquotes.aio.base import abort, execute, fetch, get_field, get_fields, get_server_channel, get_timestamp
+from disquotes.lib.events import (ARCHIVE_MESSAGES, INSERT_EVENTS, PushedEvent, event_params, event_renames,
+                                  events_page, message_channels, message_params, parse_guilds, parse_paging,
+                                  select_events)
+from disquotes.model.types import EVENT_TYPES
+from disquotes.model.validators import validate_push
+
+routes = web.RouteTableDef()
+
+
+@routes.put("/api/events/bulk")
+async def put_bulk(request):
+    fields = await get_fields(request)
+    server_names, channels, channel_names = parse_guilds(get_field(fields, "data", asjson=True) or {})
+
+    # Two statements for every guild and channel the bot is in, only writing the names that changed.
+    await request.app["resolver"].servers(server_names, names=server_names)
+    await request.app["resolver"].channels(channels, names=channel_names)
+
+    return web.json_response(None)
+
+
+@routes.put("/api/events/bulk_channel")
+async def put_bulk_channel(request):
+    fields = await get_fields(request)
+    messages = get_field(fields, "data", asjson=True) or []
+
+    channels = await request.app["resolver"].channels(message_channels(messages), create=True)
+    params = message_params(messages, channels)
+
+    if params:
+        async with request.app["pool"].acquire() as connection:
+            await execute(connection, ARCHIVE_MESSAGES, params)
+
+    return web.json_response(None)
+
+
+@routes.get("/api/events/{event_type}")
+async def get_events(request):
+    event_type = request.match_info["event_type"]
+    fields = dict(request.query)
+
+    limit, before = parse_paging(fields.get("limit", 5), fields.get("before"))
+    since, until = (get_timestamp(fields, name) for name in ("since", "until"))
+
+    if event_type != "all" and event_type not in EVENT_TYPES:
+        abort(400, f"Invalid event type specified. You have inputted `{event_type}`")
+
+    server, channel = await get_server_channel(request.app["resolver"], fields)
+
+    if "channel" in fields and not channel:
+        return web.json_response({
+            "events": [],
+            "cursor": None
+        })
+
+    statement, params = select_events(server, channel, event_type, limit, before, since, until)
+
+    async with request.app["pool"].acquire() as connection:
+        rows = await fetch(connection, statement, params)
+
+    return web.json_response(events_page(rows, limit))
+
+
+@routes.put("/api/events/{event_type}")
+async def put_event(request):
+    event_type = request.match_info["event_type"]
+    fields = await get_fields(request)
+
+    invalid = validate_push(fields, event_type)
+    if invalid:
+        abort(400, "Invalid event payload.")
+
+    try:
+        server_id = int(get_field(fields, "server", 0))
+    except (TypeError, ValueError):
+        server_id = 0
+
+    if not server_id:
+        abort(400, "Server ID field is blank.")
+
+    try:
+        channel_id = int(get_field(fields, "channel", 0)) or None
+    except (TypeError, ValueError):
+        channel_id = None
+
+    events = [PushedEvent(event_type, server_id, channel_id, get_field(fields, "data", default={}, asjson=True))]
+    resolver = request.app["resolver"]
+
+    servers = await resolver.servers([server_id], create=True)
+    channels = await resolver.channels({channel_id: server_id} if channel_id else {}, create=True)
+
+    async with request.app["pool"].acquire() as connection:
+        await execute(connection, INSERT_EVENTS, event_params(events, servers, channels))
+
+    server_names, renamed, channel_names = event_renames(events, channels)
+
+    if server_names:
+        await resolver.servers(server_names, names=server_names)
+
+    if channel_names:
+        await resolver.channels(renamed, names=channel_names)
+
+    return web.json_response(None)
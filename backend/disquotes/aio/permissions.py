@@ -0,0 +1,76 @@
+# coding=utf-8
+from aiohttp import web
+
+from disquotes.aio.base import abort, execute, fetch, get_field, get_fields, get_server_channel
+from disquotes.lib.permissions import (BUMP_VERSION, DELETE_PERMISSION, INSERT_PERMISSION, PERMISSION_EXISTS,
+                                       SELECT_GUILD_PERMISSIONS, SELECT_PERMISSIONS, SELECT_VERSION, guild_permissions)
+
+routes = web.RouteTableDef()
+
+
+@routes.get("/api/permissions/")
+async def get_permissions(request):
+    fields = dict(request.query)
+    server, channel = await get_server_channel(request.app["resolver"], fields)
+
+    async with request.app["pool"].acquire() as connection:
+        rows = await fetch(connection, SELECT_PERMISSIONS, dict(server=server, channel=channel))
+
+    return web.json_response({
+        "permissions": [row["permission"] for row in rows]
+    })
+
+
+@routes.put("/api/permissions/")
+async def put_permission(request):
+    fields = await get_fields(request)
+    server, channel = await get_server_channel(request.app["resolver"], fields, create=True)
+    params = dict(server=server, channel=channel, permission=get_field(fields, "perm"))
+
+    async with request.app["pool"].acquire() as connection:
+        async with connection.transaction():
+            if await fetch(connection, PERMISSION_EXISTS, params):
+                abort(400, "Permission already exists for this channel/server.")
+
+            await execute(connection, INSERT_PERMISSION, params)
+            await execute(connection, BUMP_VERSION, dict(server=server))
+
+    return web.json_response(None)
+
+
+@routes.delete("/api/permissions/")
+async def delete_permission(request):
+    fields = await get_fields(request)
+    server, channel = await get_server_channel(request.app["resolver"], fields)
+    params = dict(server=server, channel=channel, permission=get_field(fields, "perm"))
+
+    async with request.app["pool"].acquire() as connection:
+        async with connection.transaction():
+            await execute(connection, DELETE_PERMISSION, params)
+            await execute(connection, BUMP_VERSION, dict(server=server))
+
+    return web.json_response(None)
+
+
+@routes.get("/api/permissions/guild/{guild_id:\\d+}")
+async def get_guild_permissions(request):
+    guild_id = int(request.match_info["guild_id"])
+    server, _ = await get_server_channel(request.app["resolver"], {}, server=guild_id)
+
+    async with request.app["pool"].acquire() as connection:
+        # Read the version before the permissions, a change in between then only costs the client a refetch.
+        version = (await fetch(connection, SELECT_VERSION, dict(server=server)))[0][0]
+        etag = f'"{version}"'
+
+        if etag in request.headers.get("If-None-Match", ""):
+            return web.Response(status=304, headers={"ETag": etag})
+
+        guild_perms, channel_perms = guild_permissions(
+            await fetch(connection, SELECT_GUILD_PERMISSIONS, dict(server=server))
+        )
+
+    return web.json_response({
+        "version": version,
+        "server": guild_perms,
+        "channels": channel_perms
+    }, headers={"ETag": etag})
@@ -0,0 +1,143 @@
+# coding=utf-8
+"""
+Consumer for the event stream the bot writes to.
+
+Run any number of `python -m disquotes.ingest` workers, they share the stream through a consumer group.
+"""
+import datetime
+import json
+import logging
+import os
+import socket
+import time
+
+from redis import ResponseError, StrictRedis
+
+from disquotes.lib.events import PushedEvent, add_events, archive_messages, sync_guilds
+from disquotes.model import sm
+from disquotes.model.handlers import redis_pool
+from disquotes.model.types import EVENT_TYPES
+
+log = logging.getLogger(__name__)
+
+STREAM = os.environ.get("EVENTS_STREAM", "events:ingest")
+DEAD_STREAM = STREAM + ":dead"
+GROUP = "disquotes"
+
+BATCH_SIZE = int(os.environ.get("INGEST_BATCH_SIZE", 500))
+BLOCK_TIME = 5000  # milliseconds
+# Entries left pending this long by a consumer that went away are taken over.
+CLAIM_IDLE_TIME = 60 * 1000  # 60s * 1000ms = 1 minute
+CLAIM_INTERVAL = 30
+
+
+class Consumer(object):
+    def __init__(self, redis: StrictRedis, name: str):
+        self.redis = redis
+        self.name = name
+        self.last_claim = 0
+
+    def ensure_group(self):
+        try:
+            self.redis.xgroup_create(STREAM, GROUP, id="0", mkstream=True)
+        except ResponseError as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+
+    def run(self):
+        self.ensure_group()
+
+        # Entries delivered to this consumer before a restart come first.
+        self.process(self.read("0"))
+
+        while True:
+            if time.time() - self.last_claim > CLAIM_INTERVAL:
+                self.process(self.claim())
+                self.last_claim = time.time()
+
+            self.process(self.read(">"))
+
+    def read(self, start: str) -> list:
+        reply = self.redis.xreadgroup(GROUP, self.name, {STREAM: start}, count=BATCH_SIZE, block=BLOCK_TIME)
+        return reply[0][1] if reply else []
+
+    def claim(self) -> list:
+        pending = self.redis.xpending_range(STREAM, GROUP, "-", "+", BATCH_SIZE)
+        stale = [entry["message_id"] for entry in pending if entry["time_since_delivered"] >= CLAIM_IDLE_TIME]
+
+        if not stale:
+            return []
+
+        log.info("Claiming %s stale entries.", len(stale))
+        return self.redis.xclaim(STREAM, GROUP, self.name, CLAIM_IDLE_TIME, stale)
+
+    def process(self, entries: list):
+        if not entries:
+            return
+
+        entry_ids = [entry_id for entry_id, _ in entries]
+        # Claimed entries come back without fields if they were trimmed from the stream in the meantime.
+        entries = [(entry_id, fields) for entry_id, fields in entries if fields]
+
+        try:
+            if entries:
+                self.write(entries)
+        except Exception:
+            log.exception("Failed to write a batch of %s entries, retrying them one at a time.", len(entries))
+
+            for entry in entries:
+                try:
+                    self.write([entry])
+                except Exception:
+                    log.exception("Moving entry %s to %s.", entry[0], DEAD_STREAM)
+                    self.redis.xadd(DEAD_STREAM, entry[1])
+
+        self.redis.xack(STREAM, GROUP, *entry_ids)
+
+    def write(self, entries: list):
+        guilds = {}
+        messages = []
+        events = []
+
+        for entry_id, fields in entries:
+            event_type = fields["type"]
+            payload = json.loads(fields["payload"])
+
+            if event_type == "bulk":
+                guilds.update(payload["data"])
+            elif event_type == "bulk_channel":
+                messages.extend(payload["data"])
+            elif event_type in EVENT_TYPES:
+                # Entry IDs start with the time they were added in milliseconds, which beats the time we got to them.
+                posted = datetime.datetime.fromtimestamp(int(entry_id.split("-")[0]) / 1000)
+                events.append(PushedEvent(event_type, payload["server"], payload["channel"], payload["data"], posted))
+            else:
+                log.warning("Dropping entry %s of unknown type %s.", entry_id, event_type)
+
+        if guilds:
+            sync_guilds(guilds)
+
+        session = sm()
+        try:
+            archive_messages(session, messages)
+            add_events(session, events)
+            session.commit()
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+
+    consumer = Consumer(
+        StrictRedis(connection_pool=redis_pool),
+        os.environ.get("INGEST_CONSUMER", f"{socket.gethostname()}-{os.getpid()}")
+    )
+    consumer.run()
+
+
+if __name__ == "__main__":
+    main()
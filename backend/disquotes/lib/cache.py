@@ -1,12 +1,19 @@
 # coding=utf-8
 from dogpile.cache import make_region
+from redis import ConnectionPool
 
 from disquotes.model.handlers import redis_pool
 
+# Cached values are pickled, so the cache needs a pool that hands back bytes.
+cache_pool = ConnectionPool(**dict(redis_pool.connection_kwargs, decode_responses=False))
+
 redis_cache = make_region().configure(
     'dogpile.cache.redis',
     expiration_time=3600,
     arguments={
-        "connection_pool": redis_pool
+        "connection_pool": cache_pool,
+        # One process regenerates an expired value while the others keep serving the old one.
+        "distributed_lock": True,
+        "lock_timeout": 30
     },
 )
@@ -0,0 +1,293 @@
+# coding=utf-8
+import datetime
+import json
+import logging
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.sql.elements import TextClause
+
+from disquotes.lib.resolver import resolver
+from disquotes.lib.snowflake import snowflake_time
+from disquotes.model import now
+
+log = logging.getLogger(__name__)
+
+# Statements and parameters are shared by the Flask API and the asyncio API, see disquotes.lib.sql. Batches go in as
+# arrays through unnest, JSON columns as text that is cast back.
+ARCHIVE_MESSAGES = text("""
+    INSERT INTO messages (
+        message_id, server_id, channel_id, author_id, tts, pinned, attachments, reactions, embeds,
+        created, edited, message, search_vector
+    )
+    SELECT
+        message_id, server_id, channel_id, author_id, tts, pinned,
+        CAST(attachments AS JSONB), CAST(reactions AS JSONB), CAST(embeds AS JSONB),
+        created, edited, message, to_tsvector('simple', message)
+    FROM unnest(
+        CAST(:message_ids AS BIGINT[]), CAST(:server_ids AS INTEGER[]), CAST(:channel_ids AS INTEGER[]),
+        CAST(:author_ids AS BIGINT[]), CAST(:tts AS BOOLEAN[]), CAST(:pinned AS BOOLEAN[]),
+        CAST(:attachments AS TEXT[]), CAST(:reactions AS TEXT[]), CAST(:embeds AS TEXT[]),
+        CAST(:created AS TIMESTAMP[]), CAST(:edited AS TIMESTAMP[]), CAST(:messages AS TEXT[])
+    ) AS input (
+        message_id, server_id, channel_id, author_id, tts, pinned, attachments, reactions, embeds,
+        created, edited, message
+    )
+    ON CONFLICT (message_id, created) DO UPDATE SET
+        server_id = excluded.server_id,
+        channel_id = excluded.channel_id,
+        author_id = excluded.author_id,
+        tts = excluded.tts,
+        pinned = excluded.pinned,
+        attachments = excluded.attachments,
+        reactions = excluded.reactions,
+        embeds = excluded.embeds,
+        edited = COALESCE(excluded.edited, messages.edited),
+        message = excluded.message,
+        search_vector = excluded.search_vector
+""")
+
+INSERT_EVENTS = text("""
+    INSERT INTO events (server_id, channel_id, posted, type, data)
+    SELECT server_id, channel_id, posted, type, CAST(data AS JSONB) FROM unnest(
+        CAST(:server_ids AS INTEGER[]), CAST(:channel_ids AS INTEGER[]), CAST(:posted AS TIMESTAMP[]),
+        CAST(:types AS VARCHAR[]), CAST(:data AS TEXT[])
+    ) AS input (server_id, channel_id, posted, type, data)
+""")
+
+
+class PushedEvent(NamedTuple):
+    type: str
+    server: int
+    channel: Optional[int]
+    data: dict
+    posted: Optional[datetime.datetime] = None
+
+
+def parse_guilds(data: dict) -> Tuple[Dict[int, str], Dict[int, int], Dict[int, str]]:
+    """
+    Flattens a guild sync.
+
+    :param data: Discord server IDs to dicts with the server's name and its channel names by Discord channel ID.
+    :return: A tuple of the server names, the channels' servers and the channel names, all by Discord ID.
+    """
+    server_names = {}
+    channels = {}
+    channel_names = {}
+
+    for server_id, server_data in data.items():
+        server_names[int(server_id)] = server_data.get("name")
+
+        for channel_id, channel_name in server_data["channels"].items():
+            channels[int(channel_id)] = int(server_id)
+            channel_names[int(channel_id)] = channel_name
+
+    return server_names, channels, channel_names
+
+
+def sync_guilds(data: dict):
+    """
+    Creates and renames the servers and channels the bot is in.
+
+    :param data: See `parse_guilds`.
+    """
+    server_names, channels, channel_names = parse_guilds(data)
+
+    # Two statements for every guild and channel the bot is in, only writing the names that changed.
+    resolver.servers(server_names, names=server_names)
+    resolver.channels(channels, names=channel_names)
+
+
+def parse_paging(limit, before) -> Tuple[int, Optional[int]]:
+    """
+    Validates the paging arguments of an events listing.
+
+    :return: A tuple of the limit, 5 unless it is between 1 and 200, and the ID to list events before.
+    """
+    try:
+        limit = int(limit)
+        if limit < 1 or limit > 200:
+            raise ValueError()
+    except (ValueError, TypeError):
+        limit = 5
+
+    try:
+        before = int(before)
+    except (ValueError, TypeError):
+        before = None
+
+    return limit, before
+
+
+def select_events(
+    server: int,
+    channel: Optional[int],
+    event_type: str,
+    limit: int,
+    before: Optional[int]=None,
+    since: Optional[datetime.datetime]=None,
+    until: Optional[datetime.datetime]=None
+) -> Tuple[TextClause, dict]:
+    """
+    Builds the query of a page of events, newest first.
+
+    Pages go by ID so the (server/channel, type, id) indexes give the rows already in order, and bounds on the posted
+    time let Postgres skip the monthly partitions outside of them.
+
+    :return: A tuple of the statement and its parameters.
+    """
+    filters = {
+        "server_id = :server": ("server", server),
+        "type = :type": ("type", event_type if event_type != "all" else None),
+        "channel_id = :channel": ("channel", channel),
+        "id < :before": ("before", before),
+        "posted >= :since": ("since", since),
+        "posted < :until": ("until", until),
+    }
+
+    clauses = [clause for clause, (_, value) in filters.items() if value is not None]
+    params = {name: value for name, value in filters.values() if value is not None}
+    params["limit"] = limit
+
+    return text(f"""
+        SELECT id, type, data FROM events
+        WHERE {" AND ".join(clauses)}
+        ORDER BY id DESC
+        LIMIT :limit
+    """), params
+
+
+def events_page(rows: list, limit: int) -> dict:
+    """Shapes the rows of `select_events` into the payload of an events listing, oldest first."""
+    return {
+        "events": [{"type": row["type"], "data": row["data"]} for row in reversed(rows)],
+        "cursor": rows[-1]["id"] if len(rows) == limit else None
+    }
+
+
+def message_channels(messages: List[dict]) -> Dict[int, int]:
+    """Gets the channels to resolve for a batch of archived messages."""
+    return {message["channel_id"]: message["server_id"] for message in messages}
+
+
+def message_params(messages: List[dict], channels: Dict[int, Tuple[int, int]]) -> Optional[dict]:
+    """
+    Builds the parameters of ARCHIVE_MESSAGES.
+
+    :param messages: Archived messages, as the bot sends them.
+    :param channels: The resolved channels of the messages.
+    :return: The parameters, or None when no message is left to write.
+    """
+    rows = {}
+
+    for message in messages:
+        # Channels that moved to another server do not resolve, their messages are left out of the batch.
+        if message["channel_id"] not in channels:
+            log.warning("Skipping message %s, channel %s is unresolved.", message["id"], message["channel_id"])
+            continue
+
+        # Keyed by ID, a multi-row upsert cannot touch the same row twice.
+        rows[message["id"]] = message
+
+    if not rows:
+        return None
+
+    messages = list(rows.values())
+
+    return dict(
+        message_ids=[message["id"] for message in messages],
+        server_ids=[channels[message["channel_id"]][0] for message in messages],
+        channel_ids=[channels[message["channel_id"]][1] for message in messages],
+        author_ids=[message["author_id"] for message in messages],
+        tts=[message.get("tts", False) for message in messages],
+        pinned=[message["pinned"] for message in messages],
+        attachments=[json.dumps(message["attachments"]) for message in messages],
+        reactions=[json.dumps(message.get("reactions", [])) for message in messages],
+        embeds=[json.dumps(message.get("embeds", [])) for message in messages],
+        # Derived from the ID rather than trusted from the client, it is part of the conflict target.
+        created=[snowflake_time(message["id"]) for message in messages],
+        edited=[
+            datetime.datetime.utcfromtimestamp(message["edited"]) if message.get("edited") else None
+            for message in messages
+        ],
+        messages=[message["message"] for message in messages]
+    )
+
+
+def archive_messages(session, messages: List[dict]):
+    """Upserts a batch of archived messages in a single statement."""
+    params = message_params(messages, resolver.channels(message_channels(messages), create=True))
+
+    if params:
+        session.execute(ARCHIVE_MESSAGES, params)
+
+
+def event_params(
+    events: List[PushedEvent],
+    servers: Dict[int, int],
+    channels: Dict[int, Tuple[int, int]]
+) -> dict:
+    """
+    Builds the parameters of INSERT_EVENTS.
+
+    :param servers: The resolved servers of the events.
+    :param channels: The resolved channels of the events.
+    """
+    return dict(
+        server_ids=[servers[event.server] for event in events],
+        channel_ids=[channels.get(event.channel, (None, None))[1] for event in events],
+        posted=[event.posted or now() for event in events],
+        types=[event.type for event in events],
+        data=[json.dumps(event.data) for event in events]
+    )
+
+
+def event_renames(
+    events: List[PushedEvent],
+    channels: Dict[int, Tuple[int, int]]
+) -> Tuple[Dict[int, str], Dict[int, int], Dict[int, str]]:
+    """
+    Gets the renames carried by a batch of events.
+
+    :param channels: The resolved channels of the events, renames of unresolved channels are dropped.
+    :return: A tuple of the new server names, the renamed channels' servers and the new channel names, all by
+             Discord ID.
+    """
+    server_names = {}
+    renamed = {}
+    channel_names = {}
+
+    # Later events of a batch win, like they would one request at a time.
+    for event in events:
+        if event.type == "rename_channel" and event.channel in channels:
+            renamed[event.channel] = event.server
+            channel_names[event.channel] = event.data["channel"]["after"]
+        elif event.type == "rename_guild":
+            server_names[event.server] = event.data["server"]["after"]
+        elif event.type == "guild_join":
+            server_names[event.server] = event.data["server"]["name"]
+
+    return server_names, renamed, channel_names
+
+
+def add_events(session, events: List[PushedEvent]):
+    """
+    Inserts a batch of events in a single statement and applies the renames they carry.
+
+    Event types are expected to be validated by the caller.
+    """
+    if not events:
+        return
+
+    servers = resolver.servers({event.server for event in events}, create=True)
+    channels = resolver.channels({event.channel: event.server for event in events if event.channel}, create=True)
+
+    session.execute(INSERT_EVENTS, event_params(events, servers, channels))
+
+    server_names, renamed, channel_names = event_renames(events, channels)
+
+    if server_names:
+        resolver.servers(server_names, names=server_names)
+
+    if channel_names:
+        resolver.channels(renamed, names=channel_names)
@@ -0,0 +1,120 @@
+# coding=utf-8
+import datetime
+import logging
+import os
+
+from sqlalchemy import text
+
+log = logging.getLogger(__name__)
+
+# Monthly partitions are created this many months ahead so new rows never land in the default partition.
+PRECREATE_MONTHS = 3
+
+# Table: (partition key, months of partitions to keep or 0 to keep everything)
+PARTITIONED_TABLES = {
+    "events": ("posted", int(os.environ.get("EVENTS_RETENTION_MONTHS", 0))),
+    "messages": ("created", int(os.environ.get("MESSAGES_RETENTION_MONTHS", 0))),
+}
+
+
+def add_months(month: datetime.date, months: int) -> datetime.date:
+    months = month.year * 12 + month.month - 1 + months
+    return datetime.date(months // 12, months % 12 + 1, 1)
+
+
+def partition_name(table: str, month: datetime.date) -> str:
+    return f"{table}_y{month:%Y}m{month:%m}"
+
+
+def get_partitions(connection, table: str) -> dict:
+    """
+    Gets the monthly partitions of a table.
+
+    :return: A dict of the first day of each partition's month to the partition's name.
+    """
+    rows = connection.execute(text("""
+        SELECT child.relname FROM pg_inherits
+        JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+        JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+        WHERE parent.relname = :table
+    """), table=table)
+
+    partitions = {}
+    for name, in rows:
+        try:
+            month = datetime.datetime.strptime(name, f"{table}_y%Ym%m").date()
+        except ValueError:
+            continue
+
+        partitions[month] = name
+
+    return partitions
+
+
+def create_partition(connection, table: str, month: datetime.date):
+    """
+    Creates the partition of a table for a month.
+
+    Rows of the month already sitting in the default partition are moved into the new partition, Postgres
+    refuses to attach a partition whose range overlaps rows in the default.
+    """
+    column, _ = PARTITIONED_TABLES[table]
+    name = partition_name(table, month)
+    bounds = dict(start=month, end=add_months(month, 1))
+
+    stray = connection.execute(text(
+        f"SELECT 1 FROM {table}_default WHERE {column} >= :start AND {column} < :end LIMIT 1"
+    ), **bounds).first()
+
+    if stray:
+        connection.execute(text(f"ALTER TABLE {table} DETACH PARTITION {table}_default"))
+
+    connection.execute(text(
+        f"CREATE TABLE {name} PARTITION OF {table} FOR VALUES FROM (:start) TO (:end)"
+    ), **bounds)
+
+    if stray:
+        connection.execute(text(
+            f"INSERT INTO {table} SELECT * FROM {table}_default WHERE {column} >= :start AND {column} < :end"
+        ), **bounds)
+        connection.execute(text(
+            f"DELETE FROM {table}_default WHERE {column} >= :start AND {column} < :end"
+        ), **bounds)
+        connection.execute(text(f"ALTER TABLE {table} ATTACH PARTITION {table}_default DEFAULT"))
+
+    log.info("Created partition %s.", name)
+
+
+def drop_partition(connection, table: str, month: datetime.date):
+    """Drops a month of a table, which unlike a DELETE leaves nothing behind to vacuum."""
+    name = partition_name(table, month)
+
+    connection.execute(text(f"ALTER TABLE {table} DETACH PARTITION {name}"))
+    connection.execute(text(f"DROP TABLE {name}"))
+
+    log.info("Dropped partition %s.", name)
+
+
+def maintain(connection, today: datetime.date=None):
+    """
+    Creates the upcoming monthly partitions of every partitioned table and drops those past their retention.
+
+    Meant to be run daily, see `flask partitions`.
+    """
+    this_month = (today or datetime.date.today()).replace(day=1)
+
+    for table, (_, retention) in PARTITIONED_TABLES.items():
+        partitions = get_partitions(connection, table)
+
+        for months in range(PRECREATE_MONTHS + 1):
+            month = add_months(this_month, months)
+            if month not in partitions:
+                create_partition(connection, table, month)
+
+        if not retention:
+            continue
+
+        oldest = add_months(this_month, -retention)
+        for month in sorted(partitions):
+            if month < oldest:
+                drop_partition(connection, table, month)
@@ -0,0 +1,53 @@
+# coding=utf-8
+from typing import Dict, List, Tuple
+
+from sqlalchemy import text
+
+# Statements shared by the Flask API and the asyncio API, see disquotes.lib.sql. A NULL channel is a guild-wide node.
+SELECT_PERMISSIONS = text("""
+    SELECT permission FROM permissions
+    WHERE server_id = :server AND (channel_id IS NULL OR channel_id = CAST(:channel AS INTEGER))
+""")
+
+PERMISSION_EXISTS = text("""
+    SELECT 1 FROM permissions
+    WHERE server_id = :server AND channel_id IS NOT DISTINCT FROM CAST(:channel AS INTEGER) AND permission = :permission
+""")
+
+INSERT_PERMISSION = text("""
+    INSERT INTO permissions (server_id, channel_id, permission) VALUES (:server, CAST(:channel AS INTEGER), :permission)
+""")
+
+DELETE_PERMISSION = text("""
+    DELETE FROM permissions
+    WHERE server_id = :server AND channel_id IS NOT DISTINCT FROM CAST(:channel AS INTEGER) AND permission = :permission
+""")
+
+# Every change bumps the guild's version in the same transaction, clients revalidate their copy against it.
+BUMP_VERSION = text("UPDATE servers SET permissions_version = permissions_version + 1 WHERE id = :server")
+
+SELECT_VERSION = text("SELECT permissions_version FROM servers WHERE id = :server")
+
+SELECT_GUILD_PERMISSIONS = text("""
+    SELECT channels.channel_id, permissions.permission FROM permissions
+    LEFT JOIN channels ON channels.id = permissions.channel_id
+    WHERE permissions.server_id = :server
+""")
+
+
+def guild_permissions(rows: list) -> Tuple[List[str], Dict[str, List[str]]]:
+    """
+    Splits the rows of SELECT_GUILD_PERMISSIONS.
+
+    :return: A tuple of the guild-wide nodes and the nodes of every channel by Discord channel ID.
+    """
+    guild_perms = []
+    channel_perms = {}
+
+    for channel_id, permission in rows:
+        if channel_id:
+            channel_perms.setdefault(str(channel_id), []).append(permission)
+        else:
+            guild_perms.append(permission)
+
+    return guild_perms, channel_perms
@@ -0,0 +1,232 @@
+# coding=utf-8
+import logging
+from typing import Any, Dict, Generator, Iterable, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.sql.elements import TextClause
+
+from disquotes.lib.sql import positional
+from disquotes.model import engine
+
+log = logging.getLogger(__name__)
+
+# Rows are upserted in one statement: the CTE inserts what is missing (and renames what changed) while the outer
+# SELECT, which cannot see the CTE's writes, returns the rows that already existed. Rows committed by another
+# transaction after the statement started are in neither, the resolver selects those again in a new statement.
+UPSERT_SERVERS = text("""
+    WITH input AS (
+        SELECT * FROM unnest(CAST(:ids AS BIGINT[]), CAST(:names AS VARCHAR[])) AS input (server_id, name)
+    ), upserted AS (
+        INSERT INTO servers (server_id, name)
+        SELECT server_id, name FROM input ORDER BY server_id
+        ON CONFLICT (server_id) DO UPDATE SET name = excluded.name
+        WHERE excluded.name IS NOT NULL AND servers.name IS DISTINCT FROM excluded.name
+        RETURNING server_id, id
+    )
+    SELECT server_id, id FROM upserted
+    UNION
+    SELECT server_id, id FROM servers WHERE server_id = ANY(CAST(:ids AS BIGINT[]))
+""")
+
+UPSERT_CHANNELS = text("""
+    WITH input AS (
+        SELECT * FROM unnest(
+            CAST(:ids AS BIGINT[]), CAST(:servers AS INTEGER[]), CAST(:names AS VARCHAR[])
+        ) AS input (channel_id, server_id, name)
+    ), upserted AS (
+        INSERT INTO channels (channel_id, server_id, name)
+        SELECT channel_id, server_id, name FROM input ORDER BY channel_id
+        ON CONFLICT (channel_id) DO UPDATE SET name = excluded.name
+        WHERE excluded.name IS NOT NULL AND channels.name IS DISTINCT FROM excluded.name
+        RETURNING channel_id, server_id, id
+    )
+    SELECT channel_id, server_id, id FROM upserted
+    UNION
+    SELECT channel_id, server_id, id FROM channels WHERE channel_id = ANY(CAST(:ids AS BIGINT[]))
+""")
+
+SELECT_SERVERS = text("SELECT server_id, id FROM servers WHERE server_id = ANY(CAST(:ids AS BIGINT[]))")
+SELECT_CHANNELS = text("SELECT channel_id, server_id, id FROM channels WHERE channel_id = ANY(CAST(:ids AS BIGINT[]))")
+
+
+# Resolutions are written once as generators yielding a statement and its parameters and getting the rows back,
+# IDResolver runs them on SQLAlchemy and AsyncIDResolver on asyncpg.
+Flow = Generator[Tuple[TextClause, dict], list, Any]
+
+
+class BaseIDResolver(object):
+    """
+    Resolves Discord server and channel IDs to the IDs of their rows.
+
+    Servers and channels are never deleted, so resolved IDs are kept for the life of the process. Misses are
+    upserted in one statement per table on a connection of their own, which commits them without touching the
+    request's session, so a cached ID always points at a committed row.
+    """
+
+    def __init__(self):
+        self._servers = {}
+        self._channels = {}
+
+    def _resolve_servers(self, server_ids: Iterable[int], create: bool, names: Optional[Dict[int, str]]) -> Flow:
+        names = names or {}
+        server_ids = {int(server_id) for server_id in server_ids} | set(names)
+
+        # Renames have to reach the database even when the ID is cached.
+        missing = sorted(server_id for server_id in server_ids if server_id not in self._servers or server_id in names)
+
+        if missing:
+            if create or names:
+                rows = yield UPSERT_SERVERS, dict(ids=missing, names=[names.get(i) for i in missing])
+            else:
+                rows = yield SELECT_SERVERS, dict(ids=missing)
+
+            for server_id, row_id in rows:
+                self._servers[server_id] = row_id
+
+            racing = [server_id for server_id in missing if server_id not in self._servers]
+            if racing and (create or names):
+                for server_id, row_id in (yield SELECT_SERVERS, dict(ids=racing)):
+                    self._servers[server_id] = row_id
+
+        return {server_id: self._servers[server_id] for server_id in server_ids if server_id in self._servers}
+
+    def _resolve_channels(
+        self,
+        channels: Dict[int, int],
+        create: bool,
+        names: Optional[Dict[int, str]]
+    ) -> Flow:
+        names = names or {}
+        channels = {int(channel_id): int(server_id) for channel_id, server_id in channels.items()}
+        servers = yield from self._resolve_servers(channels.values(), create or bool(names), None)
+
+        missing = sorted(
+            channel_id for channel_id, server_id in channels.items()
+            if server_id in servers and (channel_id not in self._channels or channel_id in names)
+        )
+
+        if missing:
+            if create or names:
+                rows = yield UPSERT_CHANNELS, dict(
+                    ids=missing,
+                    servers=[servers[channels[i]] for i in missing],
+                    names=[names.get(i) for i in missing]
+                )
+            else:
+                rows = yield SELECT_CHANNELS, dict(ids=missing)
+
+            for channel_id, server_row, row_id in rows:
+                self._channels[channel_id] = (server_row, row_id)
+
+            racing = [channel_id for channel_id in missing if channel_id not in self._channels]
+            if racing and (create or names):
+                for channel_id, server_row, row_id in (yield SELECT_CHANNELS, dict(ids=racing)):
+                    self._channels[channel_id] = (server_row, row_id)
+
+        resolved = {}
+        for channel_id, server_id in channels.items():
+            if channel_id in self._channels and self._channels[channel_id][0] == servers.get(server_id):
+                resolved[channel_id] = self._channels[channel_id]
+
+        return resolved
+
+
+class IDResolver(BaseIDResolver):
+    def __init__(self, bind):
+        super().__init__()
+        self.bind = bind
+
+    def servers(
+        self,
+        server_ids: Iterable[int],
+        create: bool=False,
+        names: Optional[Dict[int, str]]=None
+    ) -> Dict[int, int]:
+        """
+        Resolves servers.
+
+        :param server_ids: Discord IDs of the servers.
+        :param create: Insert the servers that do not exist yet.
+        :param names: Discord IDs to server names, updated on the rows when they have changed. Implies create.
+        :return: A dict of Discord IDs to row IDs, without the servers that do not exist.
+        """
+        return self._run(self._resolve_servers(server_ids, create, names))
+
+    def channels(
+        self,
+        channels: Dict[int, int],
+        create: bool=False,
+        names: Optional[Dict[int, str]]=None
+    ) -> Dict[int, Tuple[int, int]]:
+        """
+        Resolves channels and the servers they belong to.
+
+        :param channels: Discord channel IDs to the Discord IDs of their servers.
+        :param create: Insert the servers and channels that do not exist yet.
+        :param names: Discord channel IDs to channel names, updated on the rows when they have changed. Implies create.
+        :return: A dict of Discord channel IDs to tuples of the server row ID and channel row ID, without the
+                 channels that do not exist or belong to another server.
+        """
+        return self._run(self._resolve_channels(channels, create, names))
+
+    def _run(self, flow: Flow):
+        # Cache hits never take a connection.
+        try:
+            statement, params = next(flow)
+        except StopIteration as done:
+            return done.value
+
+        with self.bind.begin() as connection:
+            while True:
+                rows = connection.execute(statement, **params).fetchall()
+
+                try:
+                    statement, params = flow.send(rows)
+                except StopIteration as done:
+                    return done.value
+
+
+class AsyncIDResolver(BaseIDResolver):
+    """The resolver of the asyncio API, running the same statements on an asyncpg pool."""
+
+    def __init__(self, pool):
+        super().__init__()
+        self.pool = pool
+
+    async def servers(
+        self,
+        server_ids: Iterable[int],
+        create: bool=False,
+        names: Optional[Dict[int, str]]=None
+    ) -> Dict[int, int]:
+        """Resolves servers, see `IDResolver.servers`."""
+        return await self._run(self._resolve_servers(server_ids, create, names))
+
+    async def channels(
+        self,
+        channels: Dict[int, int],
+        create: bool=False,
+        names: Optional[Dict[int, str]]=None
+    ) -> Dict[int, Tuple[int, int]]:
+        """Resolves channels and the servers they belong to, see `IDResolver.channels`."""
+        return await self._run(self._resolve_channels(channels, create, names))
+
+    async def _run(self, flow: Flow):
+        try:
+            statement, params = next(flow)
+        except StopIteration as done:
+            return done.value
+
+        async with self.pool.acquire() as connection:
+            async with connection.transaction():
+                while True:
+                    sql, args = positional(statement, params)
+                    rows = await connection.fetch(sql, *args)
+
+                    try:
+                        statement, params = flow.send(rows)
+                    except StopIteration as done:
+                        return done.value
+
+
+resolver = IDResolver(engine)
@@ -0,0 +1,10 @@
+# coding=utf-8
+import datetime
+
+DISCORD_EPOCH = 1420070400000
+
+
+def snowflake_time(snowflake: int) -> datetime.datetime:
+    """Gets the naive UTC creation time of a Discord ID, exact to the millisecond."""
+    return datetime.datetime(1970, 1, 1) + datetime.timedelta(milliseconds=(int(snowflake) >> 22) + DISCORD_EPOCH)
+
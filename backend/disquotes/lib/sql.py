@@ -0,0 +1,35 @@
+# coding=utf-8
+import functools
+import re
+from typing import List, Tuple
+
+from sqlalchemy.sql.elements import TextClause
+
+# Same as SQLAlchemy's own for text(), a colon and a name that is not part of a `::` cast.
+BIND_REGEX = re.compile(r"(?<![:\w\\]):(\w+)(?!:)")
+
+
+@functools.lru_cache(maxsize=None)
+def _numbered(sql: str) -> Tuple[str, Tuple[str, ...]]:
+    names = []
+
+    def number(match):
+        if match.group(1) not in names:
+            names.append(match.group(1))
+
+        return f"${names.index(match.group(1)) + 1}"
+
+    return BIND_REGEX.sub(number, sql), tuple(names)
+
+
+def positional(statement: TextClause, params: dict) -> Tuple[str, List]:
+    """
+    Turns a text() statement and its parameters into the numbered form asyncpg takes.
+
+    The statements shared by the Flask app and the asyncio API are written once as text(), with casts written as
+    CAST(:name AS type) so the binds stay apart from them.
+
+    :return: A tuple of the SQL and the list of arguments.
+    """
+    sql, names = _numbered(statement.text)
+    return sql, [params[name] for name in names]
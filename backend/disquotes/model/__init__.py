@@ -2,8 +2,9 @@
 import datetime
 import os
 
-from sqlalchemy import BigInteger, Boolean, Column, DateTime, ForeignKey, Integer, String, Unicode, create_engine
-from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy import (BigInteger, Boolean, Column, DateTime, ForeignKey, Integer, String, Unicode, UniqueConstraint,
+                        create_engine)
+from sqlalchemy.dialects.postgresql import JSONB, TSVECTOR
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship, scoped_session, sessionmaker, validates
 from sqlalchemy.schema import Index
@@ -37,6 +38,8 @@ class Server(Base):
     server_id = Column(BigInteger, nullable=False, unique=True)
 
     name = Column(Unicode(100))
+    # Bumped on every permission change so clients can revalidate their copy of the guild's permissions.
+    permissions_version = Column(Integer, nullable=False, default=0, server_default="0")
 
     meta = Column(JSONB)
 
@@ -54,10 +57,13 @@ class Channel(Base):
 
 class Event(Base):
     __tablename__ = 'events'
-    id = Column(Integer, primary_key=True)
+    __table_args__ = {"postgresql_partition_by": "RANGE (posted)"}
+
+    # Partitioned by month of `posted`, see disquotes.lib.partitions.
+    id = Column(Integer, primary_key=True, autoincrement=True)
     server_id = Column(ForeignKey("servers.id"), nullable=False)
     channel_id = Column(ForeignKey("channels.id"))
-    posted = Column(DateTime(), nullable=False, default=now)
+    posted = Column(DateTime(), primary_key=True, default=now)
 
     type = Column(String(32), nullable=False)
     data = Column(JSONB, nullable=False)
@@ -76,9 +82,15 @@ class Event(Base):
 
 class Message(Base):
     __tablename__ = 'messages'
-    id = Column(Integer, primary_key=True)
+    __table_args__ = (
+        UniqueConstraint("message_id", "created"),
+        {"postgresql_partition_by": "RANGE (created)"}
+    )
+
+    # Partitioned by month of `created`, which is always the creation time of the message ID.
+    id = Column(Integer, primary_key=True, autoincrement=True)
 
-    message_id = Column(BigInteger, nullable=False, unique=True)
+    message_id = Column(BigInteger, nullable=False)
     server_id = Column(ForeignKey("servers.id"), nullable=False)
     channel_id = Column(ForeignKey("channels.id"), nullable=False)
     author_id = Column(BigInteger, nullable=False)
@@ -88,9 +100,11 @@ class Message(Base):
     reactions = Column(JSONB, default=[])
     embeds = Column(JSONB, default=[])
 
-    created = Column(DateTime)
+    created = Column(DateTime, primary_key=True)
     edited = Column(DateTime)
     message = Column(Unicode, nullable=False)
+    # to_tsvector('simple', message), set alongside the message by every upsert.
+    search_vector = Column(TSVECTOR)
 
     server = relationship("Server")
     channel = relationship("Channel")
@@ -108,7 +122,7 @@ class Message(Base):
             embeds=self.embeds or [],
             created=self.created,
             edited=self.edited,
-            message=message
+            message=self.message
         )
 
 class Permission(Base):
@@ -119,4 +133,7 @@ class Permission(Base):
     permission = Column(String, nullable=False)
 
 
-Index("permission_server", Permission.server_id)
+Index("event_server_type_id", Event.server_id, Event.type, Event.id)
+Index("event_channel_type_id", Event.channel_id, Event.type, Event.id)
+Index("message_search", Message.search_vector, postgresql_using="gin")
+Index("permission_server_channel", Permission.server_id, Permission.channel_id)
@@ -1,11 +1,31 @@
 # coding=utf-8
+import hashlib
+import logging
 import os
 from functools import wraps
 
+from dogpile.cache.api import NO_VALUE
 from flask import redirect, url_for
 from flask_dance.consumer import OAuth2ConsumerBlueprint
+from redis import StrictRedis
 
 from disquotes.lib.cache import redis_cache
+from disquotes.model.handlers import redis_pool
+
+log = logging.getLogger(__name__)
+
+GUILDS_EXPIRATION = 60 * 5  # 60s * 5m = 5 minutes
+# Discord can leave the Retry-After header out of a 429.
+DEFAULT_RETRY_AFTER = 5
+
+redis = StrictRedis(connection_pool=redis_pool)
+
+
+class RateLimited(Exception):
+    def __init__(self, retry_after: float, is_global: bool):
+        super().__init__(retry_after)
+        self.retry_after = retry_after
+        self.is_global = is_global
 
 
 def require_login(f):
@@ -17,9 +37,52 @@ def require_login(f):
     return inner
 
 
-@redis_cache.cache_on_arguments("access_token")
-def get_servers(access_token):
-    return discord.session.get("users/@me/guilds").json()
+def fetch_guilds() -> dict:
+    response = discord.session.get("users/@me/guilds")
+
+    if response.status_code == 429:
+        try:
+            retry_after = float(response.headers.get("Retry-After", DEFAULT_RETRY_AFTER))
+        except ValueError:
+            retry_after = DEFAULT_RETRY_AFTER
+
+        raise RateLimited(retry_after, response.headers.get("X-RateLimit-Global") == "true")
+
+    response.raise_for_status()
+    guilds = response.json()
+
+    return {
+        "servers": guilds,
+        "managed": get_user_managed_servers(guilds)
+    }
+
+
+def get_guilds(access_token: str) -> dict:
+    """
+    Gets the guilds of the logged in user, shared by every worker.
+
+    Concurrent refreshes of the same user are coalesced by the cache's distributed lock. While Discord has us rate
+    limited, the last known guilds are served instead.
+
+    :return: A dict of the user's guilds under "servers" and the ones they can manage under "managed".
+    """
+    # Access tokens are credentials, keep them out of Redis.
+    token_hash = hashlib.sha256(access_token.encode("utf8")).hexdigest()
+    key = f"discord:guilds:{token_hash}"
+    backoff_keys = [f"discord:ratelimit:{token_hash}", "discord:ratelimit:global"]
+
+    if not any(redis.exists(backoff_key) for backoff_key in backoff_keys):
+        try:
+            return redis_cache.get_or_create(key, fetch_guilds, expiration_time=GUILDS_EXPIRATION)
+        except RateLimited as e:
+            log.warning("Rate limited fetching guilds, backing off for %ss.", e.retry_after)
+            redis.set(backoff_keys[1] if e.is_global else backoff_keys[0], 1, px=int(e.retry_after * 1000))
+
+    stale = redis_cache.get(key, ignore_expiration=True)
+    if stale is NO_VALUE:
+        return {"servers": [], "managed": []}
+
+    return stale
 
 
 def get_user_managed_servers(guilds):
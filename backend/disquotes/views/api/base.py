@@ -1,13 +1,12 @@
 # coding=utf-8
+import datetime
 import json
+from typing import Optional
 
-from flask import g, request
+from flask import request
 from flask_restplus import Resource, abort
 
-from sqlalchemy.dialects.postgresql import insert
-from sqlalchemy.orm.exc import NoResultFound
-
-from disquotes.model import Channel, Server
+from disquotes.lib.resolver import resolver
 
 
 class ResourceBase(Resource):
@@ -29,7 +28,18 @@ class ResourceBase(Resource):
 
         return content
 
-    def get_server_channel(self, create=False, **kwargs) -> (Server, Channel):
+    def get_timestamp(self, field: str) -> Optional[datetime.datetime]:
+        try:
+            return datetime.datetime.utcfromtimestamp(int(self.get_field(field)))
+        except (ValueError, TypeError, OverflowError, OSError):
+            return None
+
+    def get_server_channel(self, create=False, **kwargs) -> (int, Optional[int]):
+        """
+        Resolves the server and channel of a request to the IDs of their rows.
+
+        :return: A tuple of the server row ID and the channel row ID, the latter None when no channel was given.
+        """
         server_id = int(kwargs.get("server", self.get_field("server", 0)))
         if server_id == 0:
             abort(400, "Server ID field is blank.")
@@ -39,42 +49,13 @@ class ResourceBase(Resource):
         except (TypeError, ValueError):
             channel_id = None
 
-        try:
-            server = g.db.query(Server).filter(Server.server_id == server_id).one()
-        except NoResultFound:
-            server = None
-            if create:
-                new_statement = insert(Server).values(
-                    server_id=server_id
-                ).on_conflict_do_nothing(index_elements=["server_id"])
-                g.db.execute(new_statement)
-                g.db.commit()
-                server = g.db.query(Server).filter(Server.server_id == server_id).one()
-            else:
-                abort(400, "A server object could not be found.")
+        server = resolver.servers([server_id], create=create).get(server_id)
+        if not server:
+            abort(400, "A server object could not be found.")
 
         if not channel_id:
             return server, None
 
-        try:
-            channel = g.db.query(Channel).filter(
-                Channel.server_id == server.id
-            ).filter(
-                Channel.channel_id == channel_id
-            ).one()
-        except NoResultFound:
-            channel = None
-            if create:
-                new_statement = insert(Channel).values(
-                    server_id=server.id,
-                    channel_id=channel_id
-                ).on_conflict_do_nothing(index_elements=["channel_id"])
-                g.db.execute(new_statement)
-                g.db.commit()
-                channel = g.db.query(Channel).filter(
-                    Channel.server_id == server.id
-                ).filter(
-                    Channel.channel_id == channel_id
-                ).one()
+        _, channel = resolver.channels({channel_id: server_id}, create=create).get(channel_id, (None, None))
 
         return server, channel
@@ -0,0 +1,101 @@
+# coding=utf-8
+from flask import g, request
+from flask_restplus import Namespace, abort, fields
+from sqlalchemy import func
+
+from disquotes.lib.snowflake import snowflake_time
+from disquotes.model import Channel, Message
+from disquotes.views.api.base import ResourceBase
+
+ns = Namespace("messages", "Archived messages")
+
+message_model = ns.model("Message", {
+    "message_id": fields.Integer,
+    "channel_id": fields.Integer,
+    "author_id": fields.Integer,
+    "created": fields.DateTime,
+    "edited": fields.DateTime,
+    "attachments": fields.Raw,
+    "message": fields.String
+})
+
+messages_model = ns.model("Messages", {
+    "messages": fields.List(fields.Nested(message_model)),
+    "cursor": fields.Integer(description="Pass as `cursor` to get the next page, null on the last page")
+})
+
+
+@ns.route("/search")
+class SearchResource(ResourceBase):
+    @ns.param("q", "Search query, supports \"quoted phrases\", OR and -excluded words", required=True)
+    @ns.param("server", "Discord Server ID", type=int, required=True)
+    @ns.param("channel", "Discord Channel ID", type=int)
+    @ns.param("author", "Discord User ID of the author", type=int)
+    @ns.param("after", "Only get messages sent after this Unix timestamp", type=int)
+    @ns.param("before", "Only get messages sent before this Unix timestamp", type=int)
+    @ns.param("cursor", "Get messages older than this message ID (the cursor of the previous page)", type=int)
+    @ns.param("limit", "Maximum messages returned (1-100)", type=int)
+    @ns.marshal_with(messages_model)
+    def get(self):
+        search = self.get_field("q", "").strip()
+        if not search:
+            abort(400, "Search query is blank.")
+
+        limit = request.args.get("limit", 25)
+        try:
+            limit = int(limit)
+            if limit < 1 or limit > 100:
+                raise ValueError()
+        except (ValueError, TypeError):
+            limit = 25
+
+        try:
+            author = int(self.get_field("author", 0))
+            cursor = int(self.get_field("cursor", 0))
+        except (ValueError, TypeError):
+            abort(400, "Author and cursor must be Discord IDs.")
+
+        server, channel = self.get_server_channel(create=False)
+        if "channel" in request.args and not channel:
+            return {
+                "messages": []
+            }
+
+        query = g.db.query(Message, Channel.channel_id).join(
+            Channel, Message.channel_id == Channel.id
+        ).filter(
+            Message.server_id == server
+        ).filter(
+            Message.search_vector.op("@@")(func.websearch_to_tsquery("simple", search))
+        )
+
+        if channel:
+            query = query.filter(Message.channel_id == channel)
+
+        if author:
+            query = query.filter(Message.author_id == author)
+
+        # Every bound on the creation time lets Postgres skip the monthly partitions outside of it.
+        after, before = (self.get_timestamp(name) for name in ("after", "before"))
+
+        if after:
+            query = query.filter(Message.created >= after)
+
+        if before:
+            query = query.filter(Message.created < before)
+
+        if cursor:
+            query = query.filter(Message.message_id < cursor).filter(Message.created <= snowflake_time(cursor))
+
+        rows = query.order_by(Message.message_id.desc()).limit(limit).all()
+
+        messages = []
+        for message, channel_id in rows:
+            result = message.to_dict()
+            result["channel_id"] = channel_id
+            messages.append(result)
+
+        return {
+            "messages": messages,
+            "cursor": rows[-1][0].message_id if len(rows) == limit else None
+        }
@@ -1,9 +1,10 @@
 # coding=utf-8
-from flask import g
+from flask import Response, g, request
 from flask_restplus import Namespace, abort, fields
-from sqlalchemy import and_, or_
 
-from disquotes.model import Permission
+from disquotes.lib.permissions import (BUMP_VERSION, DELETE_PERMISSION, INSERT_PERMISSION, PERMISSION_EXISTS,
+                                       SELECT_GUILD_PERMISSIONS, SELECT_PERMISSIONS, SELECT_VERSION, guild_permissions)
+from disquotes.lib.resolver import resolver
 from disquotes.views.api.base import ResourceBase
 
 ns = Namespace("permissions", "Permissions storage.")
@@ -19,61 +20,52 @@ permission_model = ns.model("Permission", {
 class PermissionResource(ResourceBase):
     def get(self):
         server, channel = self.get_server_channel()
-
-        if channel:
-            query = g.db.query(Permission.permission).filter(and_(
-                Permission.server_id == server.id,
-                or_(
-                    Permission.channel_id == channel.id,
-                    Permission.channel_id == None
-                )
-            ))
-        else:
-            query = g.db.query(Permission.permission).filter(and_(
-                Permission.server_id == server.id,
-                Permission.channel_id == None
-            ))
+        rows = g.db.execute(SELECT_PERMISSIONS, dict(server=server, channel=channel))
 
         return {
-            "permissions": [x[0] for x in query.all()]
+            "permissions": [row[0] for row in rows]
         }
 
     @ns.param("perm", "Permission node", required=True)
     def put(self):
         server, channel = self.get_server_channel(create=True)
+        params = dict(server=server, channel=channel, permission=self.get_field("perm"))
 
-        if channel:
-            query = g.db.query(Permission.permission).filter(and_(
-                Permission.server_id == server.id,
-                Permission.channel_id == channel.id
-            ))
-        else:
-            query = g.db.query(Permission.permission).filter(and_(
-                Permission.server_id == server.id,
-                Permission.channel_id == None
-            ))
-
-        if query.filter(Permission.permission == self.get_field("perm")).scalar():
+        if g.db.execute(PERMISSION_EXISTS, params).scalar():
             abort(400, "Permission already exists for this channel/server.")
 
-        new_perm = Permission(
-            server_id=server.id,
-            channel_id=channel.id if channel else None,
-            permission=self.get_field("perm")
-        )
-
-        g.db.add(new_perm)
+        g.db.execute(INSERT_PERMISSION, params)
+        g.db.execute(BUMP_VERSION, dict(server=server))
 
     @ns.param("perm", "Permission node", required=True)
     def delete(self):
         server, channel = self.get_server_channel()
+        params = dict(server=server, channel=channel, permission=self.get_field("perm"))
+
+        g.db.execute(DELETE_PERMISSION, params)
+        g.db.execute(BUMP_VERSION, dict(server=server))
+
 
-        if channel:
-            deleted_perm = g.db.query(Permission).filter(Permission.channel_id == channel.id)
-        else:
-            deleted_perm = g.db.query(Permission).filter(and_(
-                Permission.server_id == server.id,
-                Permission.channel_id == None
-            ))
+@ns.route("/guild/<int:guild_id>")
+@ns.param("guild_id", "Discord Server ID")
+class GuildPermissionResource(ResourceBase):
+    @ns.response(304, "The permissions have not changed since the version in If-None-Match")
+    def get(self, guild_id):
+        server = resolver.servers([guild_id]).get(guild_id)
+        if not server:
+            abort(400, "A server object could not be found.")
 
-        deleted_perm = deleted_perm.filter(Permission.permission == self.get_field("perm")).delete()
+        # Read the version before the permissions, a change in between then only costs the client a refetch.
+        version = g.db.execute(SELECT_VERSION, dict(server=server)).scalar()
+        etag = str(version)
+
+        if request.if_none_match.contains(etag):
+            return Response(status=304, headers={"ETag": f'"{etag}"'})
+
+        guild_perms, channel_perms = guild_permissions(g.db.execute(SELECT_GUILD_PERMISSIONS, dict(server=server)))
+
+        return {
+            "version": version,
+            "server": guild_perms,
+            "channels": channel_perms
+        }, 200, {"ETag": f'"{etag}"'}
@@ -1,25 +1,36 @@
 # coding=utf-8
-from flask import Blueprint, g, redirect, render_template, session, url_for
+from flask import Blueprint, g, redirect, render_template, request, session, url_for
+from sqlalchemy import func
+from sqlalchemy.orm import joinedload
 from sqlalchemy.orm.exc import NoResultFound
 
+from disquotes.lib.cache import redis_cache
 from disquotes.model import Event, Server
-from disquotes.model.auth import get_servers, get_user_managed_servers, require_login
+from disquotes.model.auth import get_guilds, require_login
 
 blueprint = Blueprint("frontend", __name__)
 
+DELETED_PAGE_SIZE = 50
+
 
 @blueprint.before_request
 def before_app():
     if "oauth-discord_oauth_token" in session:
         g.session_token = session["oauth-discord_oauth_token"]["access_token"]
-        g.servers = get_servers(g.session_token)
+        guilds = get_guilds(g.session_token)
+        g.servers = guilds["servers"]
+        g.managed_servers = guilds["managed"]
 
 
 @blueprint.route("/")
 @require_login
 def front():
-    user_servers = get_user_managed_servers(g.servers)
-    quoted_servers = [str(x[0]) for x in g.db.query(Server.server_id).all()]
+    user_servers = g.managed_servers
+
+    # Only look up the servers the user can manage, on the unique index.
+    quoted_servers = [str(x[0]) for x in g.db.query(Server.server_id).filter(
+        Server.server_id.in_([int(server["id"]) for server in user_servers])
+    ).all()] if user_servers else []
 
     return render_template(
         "index.html",
@@ -39,10 +50,46 @@ def deleted_messages(serverid=None):
     except NoResultFound:
         return redirect(url_for("frontend.front"))
 
-    events = g.db.query(Event).filter(Event.server_id == server.id).order_by(Event.posted.desc()).limit(200).all()
+    try:
+        before = int(request.args.get("before", 0))
+    except ValueError:
+        before = 0
+
+    if before:
+        # Older pages only hold events below their cursor, new deletes never change them.
+        key = f"frontend:deleted:{server.id}:before:{before}"
+    else:
+        # The first page is keyed on the server's newest delete, which a new delete moves to a fresh key.
+        latest = g.db.query(func.max(Event.id)).filter(Event.server_id == server.id, Event.type == "delete").scalar()
+        key = f"frontend:deleted:{server.id}:latest:{latest}"
+
+    page, next_before = redis_cache.get_or_create(key, lambda: render_deleted_page(server.id, before))
 
     return render_template(
         "events.html",
         server=server,
-        events=events
+        events=page,
+        before=next_before
+    )
+
+
+def render_deleted_page(server_id: int, before: int):
+    """
+    Renders a page of deleted messages.
+
+    :return: A tuple of the page's HTML and the cursor of the next page, None on the last page.
+    """
+    query = g.db.query(Event).options(
+        joinedload(Event.channel)
+    ).filter(
+        Event.server_id == server_id,
+        Event.type == "delete"
     )
+
+    if before:
+        query = query.filter(Event.id < before)
+
+    events = query.order_by(Event.id.desc()).limit(DELETED_PAGE_SIZE + 1).all()
+    next_before = events[DELETED_PAGE_SIZE - 1].id if len(events) > DELETED_PAGE_SIZE else None
+
+    return render_template("events_list.html", events=events[:DELETED_PAGE_SIZE]), next_before
@@ -1,16 +1,23 @@
 # coding=utf-8
 import asyncio
+import collections
 import logging
 import os
 import time
 import traceback
-from typing import Optional
+from typing import Iterable, Optional
 
 import aiohttp
 import asyncio_redis
 import discord
 import raven
 
+from homura.lib.cluster import HEALTH_INTERVAL, HEALTH_KEY
+from homura.lib.coordination import Coordinator
+from homura.lib.deletions import DeletionScheduler
+from homura.lib.logqueue import LogQueue
+from homura.lib.recent import RecentSet
+from homura.lib.roles import RoleIndex
 from homura.lib.redis_mods import BotEncoder, UncheckedRedisProtocol
 from homura.lib.stats import CustomInfluxDBClient
 from homura.lib.structure import Message
@@ -31,6 +38,11 @@ if "DEBUG" in os.environ:
 
 log = logging.getLogger(__name__)
 
+# Seconds the deletes made by the bot are remembered, so their delete events are not logged.
+IGNORE_WINDOW = 120
+# Seconds deletes are batched for before they are shared with the other processes through Redis.
+IGNORE_FLUSH_INTERVAL = 1
+
 
 # Load opus libraries if not loaded already
 
@@ -46,9 +58,19 @@ if not discord.opus.is_loaded():
         raise Exception("Opus library could not be loaded.")
 
 
-class NepeatBot(discord.Client):
-    def __init__(self):
+class NepeatBot(discord.AutoShardedClient):
+    def __init__(self, shard_ids: Optional[list]=None, shard_count: Optional[int]=None, cluster_id: int=0):
+        self.cluster_id = cluster_id
+        self.health_task = None
+
         self.plugins = PluginManager(self)
+        self.coordinator = Coordinator(self)
+        self.roles = RoleIndex()
+        self.started = time.time()
+
+        self.deleted = RecentSet(IGNORE_WINDOW)
+        self._deleted_pending = collections.defaultdict(set)
+        self._deleted_handle = None
         self.all_permissions = set()
 
         self.sentry = raven.Client(
@@ -65,9 +87,11 @@ class NepeatBot(discord.Client):
         else:
             self.stats = Dummy()
 
-        super().__init__()
+        super().__init__(shard_ids=shard_ids, shard_count=shard_count)
 
         self.aiosession = aiohttp.ClientSession(loop=self.loop)
+        self.deletions = DeletionScheduler(self)
+        self.log_queue = LogQueue(self)
 
     async def create_redis(self):
         if hasattr(self, "redis"):
@@ -87,6 +111,27 @@ class NepeatBot(discord.Client):
         await self.create_redis()
         self.plugins.load_all()
 
+    async def report_health(self):
+        while not self.is_closed():
+            guilds = collections.Counter(guild.shard_id for guild in self.guilds)
+            health = {
+                str(shard_id): {
+                    "cluster": self.cluster_id,
+                    "pid": os.getpid(),
+                    "guilds": guilds[shard_id],
+                    "latency": latency,
+                    "updated": time.time()
+                } for shard_id, latency in self.latencies
+            }
+
+            try:
+                if health:
+                    await self.redis.hmset(HEALTH_KEY, health)
+            except asyncio_redis.Error:
+                log.exception("Unable to report shard health.")
+
+            await asyncio.sleep(HEALTH_INTERVAL)
+
     async def _plugin_run_event(self, method, *args, **kwargs):
         start = time.time()
 
@@ -141,19 +186,60 @@ class NepeatBot(discord.Client):
             file=message.file
         )
 
+        # Deletions are scheduled rather than waited for, the reply is deleted as long after the invoking message.
+        delay = 0
+
         if message.delete_invoking and invoking:
-            await asyncio.sleep(message.delete_invoking)
-            await self.delete_message(invoking)
+            delay = message.delete_invoking
+            await self.deletions.schedule(invoking, delay)
 
         if message.delete_after:
-            await asyncio.sleep(message.delete_after)
-            await self.delete_message(sentmsg)
+            await self.deletions.schedule(sentmsg, delay + message.delete_after)
 
     # Overloads
 
+    def ignore_deletes(self, guild_id: int, ids: Iterable[int]):
+        self.deleted.add(ids)
+
+        self._deleted_pending[guild_id].update(ids)
+        if not self._deleted_handle:
+            self._deleted_handle = self.loop.call_later(
+                IGNORE_FLUSH_INTERVAL,
+                lambda: asyncio.ensure_future(self.flush_deletes(), loop=self.loop)
+            )
+
+    async def flush_deletes(self):
+        if self._deleted_handle:
+            self._deleted_handle.cancel()
+            self._deleted_handle = None
+
+        pending, self._deleted_pending = self._deleted_pending, collections.defaultdict(set)
+
+        if not pending:
+            return
+
+        try:
+            transaction = await self.redis.multi()
+            for guild_id, ids in pending.items():
+                await transaction.sadd("ignored:{}".format(guild_id), list(ids))
+                await transaction.expire("ignored:{}".format(guild_id), IGNORE_WINDOW)
+            await transaction.exec()
+        except asyncio_redis.Error:
+            log.exception("Unable to share %s ignored deletes.", sum(len(ids) for ids in pending.values()))
+
+    async def is_ignored_delete(self, message) -> bool:
+        if message.id in self.deleted:
+            return True
+
+        # A guild only gets its deletes from the process running its shard, which made them itself. Deletes made by
+        # a process that had the shard before we started may still come in for a while though.
+        if time.time() - self.started < IGNORE_WINDOW:
+            return await self.redis.sismember("ignored:{}".format(message.guild.id), message.id)
+
+        return False
+
     async def delete_message(self, message):
-        await self.redis.sadd("ignored:{}".format(message.guild.id), [message.id])
-        await self.redis.expire("ignored:{}".format(message.guild.id), 120)
+        self.ignore_deletes(message.guild.id, [message.id])
 
         return await message.delete()
 
@@ -163,13 +249,13 @@ class NepeatBot(discord.Client):
             if last_guild != m.guild.id:
                 raise Exception("Mismatching guild id given for delete_messages")
 
-        await self.redis.sadd("ignored:{}".format(messages[0].guild.id), [m.id for m in messages])
-        await self.redis.expire("ignored:{}".format(messages[0].guild.id), 120)
+        self.ignore_deletes(messages[0].guild.id, [m.id for m in messages])
 
         return await messages[0].channel.delete_messages(messages)
 
     async def close(self):
         await self.plugin_dispatch("logout")
+        await self.flush_deletes()
         return await super().close()
 
     # Events
@@ -185,10 +271,19 @@ class NepeatBot(discord.Client):
         log.info("Bot ready!")
 
         await self.real_init()
+        await self.deletions.reload()
+
+        # Guilds and their roles are new objects after a reconnect.
+        self.roles.clear()
+
+        if not self.health_task:
+            self.health_task = asyncio.ensure_future(self.report_health(), loop=self.loop)
 
-        if hasattr(self, "shard_id") and self.shard_id:
-            msg = "Shard {}/{} restarted".format(
-                self.shard_id,
+        if self.shard_ids:
+            msg = "Cluster {} (shards {}-{} of {}) restarted".format(
+                self.cluster_id,
+                min(self.shard_ids),
+                max(self.shard_ids),
                 self.shard_count
             )
         else:
@@ -202,6 +297,13 @@ class NepeatBot(discord.Client):
     async def on_guild_join(self, guild):
         await self.plugin_dispatch("guild_join", guild)
 
+    async def on_guild_available(self, guild):
+        # Guilds coming back from an outage or a shard reconnect are rebuilt with new role objects.
+        self.roles.invalidate(guild)
+
+    async def on_guild_remove(self, guild):
+        self.roles.invalidate(guild)
+
     async def on_message(self, message):
         # Why. http://i.imgur.com/iQSuVnV.png
         if message.author.id == self.user.id:
@@ -209,11 +311,10 @@ class NepeatBot(discord.Client):
 
         self.stats.count("message", type="receive")
 
-        if message.content == "!shard?":
-            if hasattr(self, 'shard_id'):
-                await message.channel.send(
-                    "shard {}/{}".format(self.shard_id + 1, self.shard_count)
-                )
+        if message.content == "!shard?" and message.guild:
+            await message.channel.send(
+                "shard {}/{}, cluster {}".format(message.guild.shard_id + 1, self.shard_count, self.cluster_id)
+            )
 
         await self.plugin_dispatch("message", message)
 
@@ -240,7 +341,7 @@ class NepeatBot(discord.Client):
             return
 
         # Check: Ignore messages that we have deleted.
-        if await self.redis.sismember("ignored:{}".format(message.guild.id), message.id):
+        if await self.is_ignored_delete(message):
             return
 
         # Check: Webhooks have no display name.
@@ -275,12 +376,15 @@ class NepeatBot(discord.Client):
         await self.plugin_dispatch("guild_update", before, after)
 
     async def on_guild_role_create(self, role):
+        self.roles.invalidate(role.guild)
         await self.plugin_dispatch("guild_role_create", role)
 
     async def on_guild_role_delete(self, role):
+        self.roles.invalidate(role.guild)
         await self.plugin_dispatch("guild_role_delete", role)
 
     async def on_guild_role_update(self, before, after):
+        self.roles.invalidate(after.guild)
         await self.plugin_dispatch("guild_role_update", before, after)
 
     async def on_voice_state_update(self, member, before, after):
@@ -1,13 +1,17 @@
 # coding=utf-8
 import os
 
-from homura import NepeatBot
+from homura import NepeatBot, cluster
 
 if __name__ == "__main__":
-    bot = NepeatBot()
     token = os.environ.get("DISCORD_TOKEN", None)
 
-    if token:
-        bot.run(token)
-    else:
+    if not token:
         raise Exception("Missing token.")
+
+    # Several processes sharing the shards, see homura.cluster.
+    if "CLUSTER_WORKERS" in os.environ:
+        cluster.main()
+    else:
+        bot = NepeatBot()
+        bot.run(token)
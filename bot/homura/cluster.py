@@ -0,0 +1,175 @@
+# coding=utf-8
+"""
+Runs the bot's shards over several worker processes.
+
+The shards are split into contiguous ranges, one per worker, and every worker is a full `NepeatBot` sharing Redis
+with the others. Workers that exit are restarted with a backoff. Per-shard health is written to Redis by the
+workers themselves, see `NepeatBot.report_health`.
+"""
+import asyncio
+import logging
+import multiprocessing
+import os
+import signal
+import time
+from typing import List
+
+import aiohttp
+
+from homura import NepeatBot
+
+log = logging.getLogger(__name__)
+
+GATEWAY_URL = "https://discordapp.com/api/v7/gateway/bot"
+
+# Discord allows a single IDENTIFY every 5 seconds for the whole bot, whatever process it comes from.
+IDENTIFY_INTERVAL = 5
+POLL_INTERVAL = 1
+# Workers that stayed up this long have their backoff reset.
+STABLE_UPTIME = 60 * 10  # 60s * 10m
+MAX_BACKOFF = 60 * 5  # 60s * 5m
+STOP_TIMEOUT = 30
+
+
+def shard_ranges(shard_count: int, workers: int) -> List[List[int]]:
+    """
+    Splits shards into contiguous ranges of near equal size.
+
+    :param shard_count: Total number of shards.
+    :param workers: Number of ranges wanted, capped to the number of shards.
+    :return: A list of shard ID lists, one per worker.
+    """
+    workers = max(1, min(workers, shard_count))
+    size, extra = divmod(shard_count, workers)
+
+    ranges = []
+    start = 0
+
+    for worker in range(workers):
+        end = start + size + (1 if worker < extra else 0)
+        ranges.append(list(range(start, end)))
+        start = end
+
+    return ranges
+
+
+async def fetch_shard_count(token: str) -> int:
+    async with aiohttp.ClientSession() as session:
+        async with session.get(GATEWAY_URL, headers={"Authorization": "Bot " + token}) as res:
+            res.raise_for_status()
+            data = await res.json()
+
+    return data["shards"]
+
+
+def run_worker(cluster_id: int, shard_ids: List[int], shard_count: int, token: str):
+    bot = NepeatBot(shard_ids=shard_ids, shard_count=shard_count, cluster_id=cluster_id)
+    bot.run(token)
+
+
+class Worker(object):
+    def __init__(self, cluster_id: int, shard_ids: List[int]):
+        self.cluster_id = cluster_id
+        self.shard_ids = shard_ids
+        self.process = None
+        self.started = 0
+        self.failures = 0
+        self.restart_at = 0
+
+    def __str__(self):
+        return "cluster {} (shards {}-{})".format(self.cluster_id, self.shard_ids[0], self.shard_ids[-1])
+
+
+class Supervisor(object):
+    def __init__(self, token: str, shard_count: int, workers: int):
+        self.token = token
+        self.shard_count = shard_count
+        self.workers = [Worker(i, shard_ids) for i, shard_ids in enumerate(shard_ranges(shard_count, workers))]
+        # Workers get fresh interpreters rather than forks of the supervisor.
+        self.context = multiprocessing.get_context("spawn")
+        self.next_identify = 0
+        self.running = True
+
+    def start(self, worker: Worker):
+        worker.process = self.context.Process(
+            target=run_worker,
+            args=(worker.cluster_id, worker.shard_ids, self.shard_count, self.token),
+            name="homura-cluster-{}".format(worker.cluster_id)
+        )
+        worker.process.start()
+        worker.started = time.time()
+
+        # The worker identifies its shards one after another, the next worker waits until they all went through.
+        self.next_identify = worker.started + IDENTIFY_INTERVAL * len(worker.shard_ids)
+        log.info("Started %s as pid %s.", worker, worker.process.pid)
+
+    def check(self, worker: Worker):
+        if worker.process and worker.process.is_alive():
+            return
+
+        now = time.time()
+
+        if worker.process:
+            uptime = now - worker.started
+            worker.failures = 0 if uptime >= STABLE_UPTIME else worker.failures + 1
+            backoff = min(MAX_BACKOFF, IDENTIFY_INTERVAL * 2 ** (worker.failures - 1)) if worker.failures else 0
+            worker.restart_at = now + backoff
+
+            log.warning(
+                "%s exited with code %s after %.0fs, restarting in %ss.",
+                worker, worker.process.exitcode, uptime, backoff
+            )
+            worker.process = None
+
+        if now >= worker.restart_at and now >= self.next_identify:
+            self.start(worker)
+
+    def stop(self, *args):
+        self.running = False
+
+    def run(self):
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+
+        log.info("Running %s shards over %s workers.", self.shard_count, len(self.workers))
+
+        while self.running:
+            for worker in self.workers:
+                self.check(worker)
+
+            time.sleep(POLL_INTERVAL)
+
+        self.shutdown()
+
+    def shutdown(self):
+        alive = [worker.process for worker in self.workers if worker.process and worker.process.is_alive()]
+
+        # SIGTERM lets the bots log out cleanly.
+        for process in alive:
+            process.terminate()
+
+        for process in alive:
+            process.join(STOP_TIMEOUT)
+            if process.is_alive():
+                log.warning("Killing %s, it did not stop in %ss.", process.name, STOP_TIMEOUT)
+                process.kill()
+
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+
+    token = os.environ.get("DISCORD_TOKEN", None)
+    if not token:
+        raise Exception("Missing token.")
+
+    shard_count = int(os.environ.get("SHARD_COUNT", 0))
+    if not shard_count:
+        shard_count = asyncio.get_event_loop().run_until_complete(fetch_shard_count(token))
+
+    workers = int(os.environ.get("CLUSTER_WORKERS", 0)) or os.cpu_count() or 1
+
+    Supervisor(token, shard_count, workers).run()
+
+
+if __name__ == "__main__":
+    main()
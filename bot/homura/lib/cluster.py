@@ -0,0 +1,5 @@
+# coding=utf-8
+
+# Per-shard health, written by every process of a cluster.
+HEALTH_KEY = "cluster:shards"
+HEALTH_INTERVAL = 15
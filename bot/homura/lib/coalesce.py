@@ -0,0 +1,82 @@
+# coding=utf-8
+import asyncio
+import logging
+from typing import Hashable
+
+import asyncio_redis
+
+log = logging.getLogger(__name__)
+
+# Values only replace smaller ones, including the ones written by other processes or before the last flush.
+# Snowflakes are past what a Lua number holds exactly, so they are compared as the encoded strings: by length, then
+# by characters, which holds for integers with the same prefix and without leading zeros.
+HSET_MAX_SCRIPT = """
+for i = 1, #ARGV, 2 do
+    local current = redis.call("HGET", KEYS[1], ARGV[i])
+    if not current or #current < #ARGV[i + 1] or (#current == #ARGV[i + 1] and current < ARGV[i + 1]) then
+        redis.call("HSET", KEYS[1], ARGV[i], ARGV[i + 1])
+    end
+end
+return 0
+"""
+
+
+class MaxHash(object):
+    """
+    Write-behind cache of a Redis hash of IDs that only ever grow, like the newest message of every channel.
+
+    Updates are kept in memory and written by a single script call once `interval` seconds passed since the first
+    pending one. The flush is only scheduled while something is pending, and the script keeps the larger of the
+    stored and flushed values so a late smaller update never moves a field back.
+    """
+
+    def __init__(self, bot, key: str, interval: float=5.0):
+        self.bot = bot
+        self.key = key
+        self.interval = interval
+        self.dirty = {}
+        self._handle = None
+        self._script = None
+
+    def __len__(self):
+        return len(self.dirty)
+
+    def update(self, field: Hashable, value: int):
+        if value <= self.dirty.get(field, value - 1):
+            return
+
+        self.dirty[field] = value
+
+        if not self._handle:
+            self._handle = self.bot.loop.call_later(self.interval, self._schedule_flush)
+
+    def _schedule_flush(self):
+        self._handle = None
+        asyncio.ensure_future(self.flush(), loop=self.bot.loop)
+
+    async def flush(self):
+        if self._handle:
+            self._handle.cancel()
+            self._handle = None
+
+        if not self.dirty:
+            return
+
+        pending, self.dirty = self.dirty, {}
+
+        try:
+            if not self._script:
+                self._script = await self.bot.redis.register_script(HSET_MAX_SCRIPT)
+
+            # Fields and values go through the bot's encoder like they would for HMSET.
+            args = []
+            for field, value in pending.items():
+                args.extend((field, value))
+
+            await self._script.run(keys=[self.key], args=args)
+        except asyncio_redis.Error:
+            log.exception("Unable to flush %s pending updates to %s.", len(pending), self.key)
+
+            # Newer values that came in meanwhile win.
+            for field, value in pending.items():
+                self.update(field, value)
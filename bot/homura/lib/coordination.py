@@ -0,0 +1,169 @@
+# coding=utf-8
+import asyncio
+import logging
+import os
+import socket
+import time
+from typing import Awaitable, Callable, Optional
+
+log = logging.getLogger(__name__)
+
+# Runs kept in the history of every job.
+HISTORY_LENGTH = 50
+
+# Scripts only touch a lease while it still holds our token, an expired lease may belong to another node by now.
+RENEW_SCRIPT = """
+if redis.call("GET", KEYS[1]) == ARGV[1] then
+    return redis.call("PEXPIRE", KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+RELEASE_SCRIPT = """
+if redis.call("GET", KEYS[1]) == ARGV[1] then
+    return redis.call("DEL", KEYS[1])
+end
+return 0
+"""
+
+SCRIPTS = {
+    "renew": RENEW_SCRIPT,
+    "release": RELEASE_SCRIPT
+}
+
+
+class Lease(object):
+    """
+    A held job lease, renewed in the background at a third of its TTL until released.
+    """
+
+    def __init__(self, coordinator: "Coordinator", name: str, ttl: float):
+        self.coordinator = coordinator
+        self.name = name
+        self.ttl = ttl
+        self._renewer = asyncio.ensure_future(self._renew(), loop=coordinator.bot.loop)
+
+    @property
+    def key(self) -> str:
+        return f"lease:{self.name}"
+
+    async def _renew(self):
+        while True:
+            await asyncio.sleep(self.ttl / 3)
+
+            renewed = await self.coordinator.run_script(
+                "renew",
+                self.key,
+                self.coordinator.node,
+                str(int(self.ttl * 1000))
+            )
+
+            if not renewed:
+                log.warning("Lost the lease of %s.", self.name)
+                return
+
+    async def release(self):
+        self._renewer.cancel()
+        await self.coordinator.run_script("release", self.key, self.coordinator.node)
+
+
+class Coordinator(object):
+    """
+    Runs jobs on exactly one node of the bot.
+
+    Leases are Redis keys set with NX and PX holding the node's token, so a node that dies only blocks
+    the job until its lease expires. Every run is recorded in a capped history list per job.
+    """
+
+    def __init__(self, bot):
+        self.bot = bot
+        self.node = f"{socket.gethostname()}:{os.getpid()}"
+        self._scripts = {}
+
+    @property
+    def redis(self):
+        return self.bot.redis
+
+    async def run_script(self, name: str, key: str, *args: str):
+        if name not in self._scripts:
+            self._scripts[name] = await self.redis.register_script(SCRIPTS[name])
+
+        reply = await self._scripts[name].run(keys=[key], args=list(args))
+        return await reply.return_value()
+
+    async def acquire(self, name: str, ttl: float=60) -> Optional[Lease]:
+        """
+        Tries to take the lease of a job.
+
+        :param name: Name of the job.
+        :param ttl: Seconds the lease outlives this node if it stops renewing it.
+        :return: The lease, or None if another node holds it.
+        """
+        acquired = await self.redis.set(
+            f"lease:{name}",
+            self.node,
+            pexpire=int(ttl * 1000),
+            only_if_not_exists=True
+        )
+
+        if not acquired:
+            return None
+
+        return Lease(self, name, ttl)
+
+    async def run_exclusive(
+        self,
+        name: str,
+        job: Callable[[], Awaitable],
+        ttl: float=60,
+        min_interval: float=0
+    ) -> bool:
+        """
+        Runs a job unless another node is running it.
+
+        :param name: Name of the job.
+        :param job: Coroutine function to run.
+        :param ttl: Seconds the lease outlives this node if it dies mid-run.
+        :param min_interval: Skip the job if it last succeeded less than this many seconds ago, on any node.
+        :return: True if the job ran on this node.
+        """
+        lease = await self.acquire(name, ttl)
+        if not lease:
+            self.bot.stats.count("job", name=name, action="skip_leased")
+            return False
+
+        started = time.time()
+        success = False
+
+        try:
+            if min_interval:
+                last_success = await self.redis.get(f"job:last:{name}")
+                if last_success and started - float(last_success) < min_interval:
+                    self.bot.stats.count("job", name=name, action="skip_recent")
+                    return False
+
+            try:
+                await job()
+                success = True
+                await self.redis.set(f"job:last:{name}", str(started))
+            finally:
+                await self.record(name, started, success)
+        finally:
+            await lease.release()
+
+        return True
+
+    async def record(self, name: str, started: float, success: bool):
+        duration = time.time() - started
+        self.bot.stats.count("job", name=name, action="run", success=str(success), count=float(duration))
+
+        await self.redis.lpush(f"job:history:{name}", [{
+            "node": self.node,
+            "started": started,
+            "duration": duration,
+            "success": success
+        }])
+        await self.redis.ltrim(f"job:history:{name}", 0, HISTORY_LENGTH - 1)
+
+    async def history(self, name: str, count: int=10) -> list:
+        return await self.redis.lrange_aslist(f"job:history:{name}", 0, count - 1)
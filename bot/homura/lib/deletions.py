@@ -0,0 +1,119 @@
+# coding=utf-8
+import logging
+import math
+import time
+from typing import Dict, List, Set, Tuple
+
+import asyncio_redis
+import discord
+
+from homura.lib.timerwheel import TimerWheel
+
+log = logging.getLogger(__name__)
+
+PENDING_KEY = "deletions:pending"
+# Scheduled deletions that no process picked up for this long are dropped on reload.
+ABANDON_AFTER = 60 * 60 * 24  # 60s * 60m * 24h = 1 day
+# Discord's bulk delete takes at most 100 messages.
+BULK_LIMIT = 100
+
+
+class DeletionScheduler(object):
+    """
+    Deletes messages after a delay.
+
+    Deletions are kept in a Redis sorted set scored by when they are due, so the processes pick theirs up again
+    after a restart, and timed on a wheel in process. Messages of a channel that are due in the same second are
+    deleted together in bulk deletes of up to 100 messages, falling back to deleting them one by one.
+    """
+
+    def __init__(self, bot):
+        self.bot = bot
+        self.wheel = TimerWheel(bot.loop)
+        # (channel ID, due second) to the guild ID and the message IDs to delete.
+        self.pending = {}  # type: Dict[Tuple[int, int], Tuple[int, Set[int]]]
+
+    @staticmethod
+    def member(guild_id: int, channel_id: int, message_id: int) -> str:
+        return f"{guild_id}:{channel_id}:{message_id}"
+
+    async def schedule(self, message: discord.Message, delay: float):
+        due = time.time() + delay
+
+        await self.bot.redis.zadd(PENDING_KEY, {self.member(message.guild.id, message.channel.id, message.id): due})
+        self._schedule_local(message.guild.id, message.channel.id, message.id, due)
+
+    def _schedule_local(self, guild_id: int, channel_id: int, message_id: int, due: float):
+        key = (channel_id, math.ceil(due))
+
+        if key not in self.pending:
+            self.pending[key] = (guild_id, set())
+            self.wheel.schedule(key, max(0, due - time.time()), lambda: self.run(key))
+
+        self.pending[key][1].add(message_id)
+
+    async def reload(self):
+        """
+        Schedules the deletions of this process' channels left over by an earlier run.
+        """
+        await self.bot.redis.zremrangebyscore(
+            PENDING_KEY,
+            asyncio_redis.ZScoreBoundary.MIN_VALUE,
+            asyncio_redis.ZScoreBoundary(time.time() - ABANDON_AFTER)
+        )
+
+        reply = await self.bot.redis.zrange(PENDING_KEY)
+        count = 0
+
+        for member, due in (await reply.asdict()).items():
+            guild_id, channel_id, message_id = (int(part) for part in member.split(":"))
+
+            # Other processes reload the channels of their own shards.
+            if not self.bot.get_channel(channel_id):
+                continue
+
+            self._schedule_local(guild_id, channel_id, message_id, due)
+            count += 1
+
+        if count:
+            log.info("Reloaded %s scheduled deletions.", count)
+
+    async def run(self, key: Tuple[int, int]):
+        self.wheel.cancel(key)
+        guild_id, message_ids = self.pending.pop(key, (None, set()))
+        if not message_ids:
+            return
+
+        channel_id = key[0]
+
+        if self.bot.get_channel(channel_id):
+            self.bot.ignore_deletes(guild_id, message_ids)
+            message_ids = sorted(message_ids)
+
+            for start in range(0, len(message_ids), BULK_LIMIT):
+                await self.delete(channel_id, message_ids[start:start + BULK_LIMIT])
+
+        self.bot.stats.count("scheduled_delete", count=float(len(message_ids)))
+        await self.bot.redis.zrem(PENDING_KEY, [
+            self.member(guild_id, channel_id, message_id) for message_id in message_ids
+        ])
+
+    async def delete(self, channel_id: int, message_ids: List[int]):
+        # Bulk deletes need Manage Messages even for the bot's own messages, at least two messages and none older
+        # than 14 days. Deleting one by one only needs the permission for the messages of others.
+        if len(message_ids) > 1:
+            try:
+                await self.bot.http.delete_messages(channel_id, message_ids)
+                return
+            except discord.NotFound:
+                return
+            except discord.HTTPException as e:
+                log.debug("Bulk delete in %s failed, deleting one by one: %s", channel_id, e)
+
+        for message_id in message_ids:
+            try:
+                await self.bot.http.delete_message(channel_id, message_id)
+            except discord.NotFound:
+                pass
+            except discord.HTTPException as e:
+                log.warning("Unable to delete message %s in %s: %s", message_id, channel_id, e)
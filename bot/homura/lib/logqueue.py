@@ -0,0 +1,151 @@
+# coding=utf-8
+import asyncio
+import collections
+import logging
+from typing import Optional
+
+import discord
+from discord.http import Route
+
+log = logging.getLogger(__name__)
+
+# Discord takes at most 10 embeds and 2000 characters in a message, and 6000 characters over all of its embeds.
+MAX_EMBEDS = 10
+MAX_CONTENT = 2000
+MAX_EMBED_LENGTH = 6000
+# Seconds entries are gathered for before a message goes out.
+FLUSH_DELAY = 0.5
+# Routine entries kept per channel while it is backed up, the oldest are dropped first.
+MAX_BACKLOG = 500
+# Priority entries kept per channel, a raid can queue them faster than they go out.
+MAX_PRIORITY_BACKLOG = 500
+
+
+def embed_length(embed: discord.Embed) -> int:
+    """Counts the characters of an embed the way Discord does for its size limit."""
+    data = embed.to_dict()
+
+    return sum((
+        len(data.get("title", "")),
+        len(data.get("description", "")),
+        len(data.get("footer", {}).get("text", "")),
+        len(data.get("author", {}).get("name", "")),
+        sum(len(field.get("name", "")) + len(field.get("value", "")) for field in data.get("fields", []))
+    ))
+
+
+class ChannelQueue(object):
+    def __init__(self):
+        self.priority = collections.deque(maxlen=MAX_PRIORITY_BACKLOG)
+        self.routine = collections.deque(maxlen=MAX_BACKLOG)
+        self.task = None
+
+    def __len__(self):
+        return len(self.priority) + len(self.routine)
+
+    def take(self) -> tuple:
+        """
+        Takes the entries of the next message, priority entries first.
+
+        Stops at whichever of Discord's limits on a message comes first, the rest is left for the next one. Nothing
+        queued behind an entry that did not fit goes out before it.
+
+        :return: A tuple of the message content and the list of embeds.
+        """
+        lines = []
+        length = 0
+        embeds = []
+        embeds_length = 0
+
+        for queue in (self.priority, self.routine):
+            while queue:
+                entry = queue[0]
+
+                if isinstance(entry, discord.Embed):
+                    entry_length = embed_length(entry)
+
+                    # An embed over the limit on its own still goes out alone, Discord will tell us about it.
+                    if embeds and (len(embeds) >= MAX_EMBEDS or embeds_length + entry_length > MAX_EMBED_LENGTH):
+                        return "\n".join(lines), embeds
+
+                    embeds.append(entry)
+                    embeds_length += entry_length
+                else:
+                    if lines and length + len(entry) + 1 > MAX_CONTENT:
+                        return "\n".join(lines), embeds
+
+                    lines.append(entry[:MAX_CONTENT])
+                    length += len(entry) + 1
+
+                queue.popleft()
+
+        return "\n".join(lines), embeds
+
+
+class LogQueue(object):
+    """
+    Coalesces the messages sent to log channels.
+
+    Every channel has its own queue and sender. The sender waits a moment to gather entries and sends them
+    as one message of up to 10 embeds, so a busy channel sends full messages at whatever pace its rate limit
+    allows. Priority entries, like antispam actions, go out before routine ones.
+    """
+
+    def __init__(self, bot):
+        self.bot = bot
+        self.queues = {}
+
+    @property
+    def backlog(self) -> int:
+        return sum(len(queue) for queue in self.queues.values())
+
+    def send(self, channel: discord.TextChannel, entry, priority: bool=False):
+        """
+        Queues a log entry.
+
+        :param channel: Log channel to send it to.
+        :param entry: An embed or a line of text.
+        :param priority: Send it before the routine entries.
+        """
+        queue = self.queues.setdefault(channel.id, ChannelQueue())
+        (queue.priority if priority else queue.routine).append(entry)
+
+        if not queue.task:
+            queue.task = asyncio.ensure_future(self.run(channel, queue), loop=self.bot.loop)
+
+    async def run(self, channel: discord.TextChannel, queue: ChannelQueue):
+        try:
+            while queue:
+                await asyncio.sleep(FLUSH_DELAY)
+
+                content, embeds = queue.take()
+                self.bot.stats.count("log_queue", count=float(len(queue)), channel=str(channel.id))
+
+                await self.post(channel, content, embeds)
+        finally:
+            # Entries queued while the last message was sent were picked up by the loop, a queue left with entries
+            # here errored out and gets a new sender with its next entry.
+            queue.task = None
+
+            if not queue:
+                self.queues.pop(channel.id, None)
+
+    async def post(self, channel: discord.TextChannel, content: Optional[str], embeds: list):
+        payload = {
+            "embeds": [embed.to_dict() for embed in embeds]
+        }
+
+        if content:
+            payload["content"] = content
+
+        try:
+            # Messages with several embeds are not supported by TextChannel.send, the HTTP client still handles
+            # the channel's rate limit.
+            await self.bot.http.request(
+                Route("POST", "/channels/{channel_id}/messages", channel_id=channel.id),
+                json=payload
+            )
+        except (discord.Forbidden, discord.NotFound):
+            log.info("Dropping %s log entries, channel %s is gone or forbidden.", len(embeds), channel.id)
+        except discord.HTTPException as e:
+            log.warning("Unable to send %s log entries to %s: %s", len(embeds), channel.id, e)
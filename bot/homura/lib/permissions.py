@@ -2,7 +2,9 @@
 import json
 import logging
 import os
-from typing import List, Optional
+import time
+from functools import lru_cache
+from typing import Iterable, List, Optional, Tuple
 
 import aiohttp
 import discord
@@ -11,6 +13,58 @@ from homura.lib.structure import BackendError
 
 log = logging.getLogger(__name__)
 
+# Seconds a guild's permissions are used before they are revalidated with the backend.
+SNAPSHOT_TTL = 10
+
+# Guild ID to the last copy of its permissions fetched from the backend.
+_snapshots = {}
+
+
+class PermissionSet(object):
+    """
+    A list of permission nodes compiled for lookups.
+
+    Answers are O(depth of the node) set lookups instead of list scans, and memoised per node.
+    A negated node anywhere on the path of a permission wins over any granted one, and "*" grants everything.
+    """
+
+    def __init__(self, perms: Iterable[str]):
+        perms = set(perms)
+
+        self.allow_all = "*" in perms
+        self.denied = frozenset(perm[1:] for perm in perms if perm.startswith("-"))
+        self.granted = frozenset(perm for perm in perms if not perm.startswith("-"))
+        self._results = {}
+
+    def check(self, perm: str, blacklist_only: bool=False) -> bool:
+        key = (perm, blacklist_only)
+
+        if key not in self._results:
+            self._results[key] = self._check(perm, blacklist_only)
+
+        return self._results[key]
+
+    def _check(self, perm: str, blacklist_only: bool) -> bool:
+        if self.allow_all:
+            return True
+
+        segments = perm.split(".")
+        path = [".".join(segments[:depth]) for depth in range(len(segments), 0, -1)]
+
+        if any(node in self.denied for node in path):
+            return False
+
+        if blacklist_only:
+            return True
+
+        return any(node in self.granted for node in path)
+
+
+@lru_cache(maxsize=1024)
+def compile_permissions(perms: Tuple[str, ...]) -> PermissionSet:
+    """Gets the compiled set of a permission list, shared by every command using the same permissions."""
+    return PermissionSet(perms)
+
 
 class Permissions(object):
     def __init__(
@@ -18,12 +72,13 @@ class Permissions(object):
         bot: Optional[discord.Client],
         message: Optional[discord.Message]
     ):
-        self.backend_url = os.environ.get("BOT_WEB", "http://localhost:5000")
+        self.backend_url = os.environ.get("BOT_API", os.environ.get("BOT_WEB", "http://localhost:5000"))
         self.bot = bot
         self.message = message
         self.guild = message.guild
         self.channel = message.channel
         self.perms = []
+        self.compiled = compile_permissions(())
 
     @classmethod
     async def create(
@@ -74,6 +129,8 @@ class Permissions(object):
                         raise BackendError("Unknown error updating permissions")
         except aiohttp.ClientError:
             pass
+        finally:
+            _snapshots.pop(self.guild.id, None)
 
     async def add(self, permission: str, guildwide: bool=False):
         await self.alter(permission, False, guildwide)
@@ -95,43 +152,64 @@ class Permissions(object):
             return None
 
         self.perms = await self.get_perms()
+        self.compiled = compile_permissions(tuple(self.perms))
 
-    async def get_perms(self, channel_id: int=None, guildonly: bool=False) -> Optional[List[str]]:
-        if not channel_id:
-            channel_id = self.channel.id
+    async def get_snapshot(self) -> Optional[dict]:
+        """
+        Gets every permission of the guild, revalidating the local copy with a conditional request once it is older
+        than SNAPSHOT_TTL.
 
-        params = {
-            "server": self.guild.id
-        }
+        :return: A dict with the guild-wide permissions under "server" and the channel permissions by channel ID
+                 under "channels", or None if the backend could not be reached and nothing is cached.
+        """
+        snapshot = _snapshots.get(self.guild.id)
+        if snapshot and time.time() - snapshot["fetched"] < SNAPSHOT_TTL:
+            return snapshot
 
-        if not guildonly:
-            params.update(
-                channel=channel_id
-            )
+        headers = {"If-None-Match": snapshot["etag"]} if snapshot and snapshot["etag"] else {}
 
         try:
             async with self.bot.aiosession.get(
-                url=self.backend_url + "/api/permissions/",
-                params=params
+                url=self.backend_url + f"/api/permissions/guild/{self.guild.id}",
+                headers=headers
             ) as response:
+                if response.status == 304:
+                    snapshot["fetched"] = time.time()
+                    return snapshot
+
                 try:
                     reply = await response.json()
                     if response.status in (400, 500):
                         log.error("Error fetching permissions.")
                         log.error(reply)
-
-                    try:
-                        return reply["permissions"]
-                    except KeyError:
-                        log.error("Permissions key is missing from permissions data?")
-                except ValueError:
-                    log.error("Error parsing JSON.")
+                        return snapshot
+
+                    snapshot = _snapshots[self.guild.id] = {
+                        "etag": response.headers.get("ETag"),
+                        "fetched": time.time(),
+                        "server": reply["server"],
+                        "channels": {int(channel_id): perms for channel_id, perms in reply["channels"].items()}
+                    }
+                except (ValueError, KeyError):
+                    log.error("Error parsing permissions.")
                     log.error(await response.text())
-                    pass
         except aiohttp.ClientError:
             pass
 
-        return []
+        return snapshot
+
+    async def get_perms(self, channel_id: int=None, guildonly: bool=False) -> Optional[List[str]]:
+        if not channel_id:
+            channel_id = self.channel.id
+
+        snapshot = await self.get_snapshot()
+        if not snapshot:
+            return []
+
+        if guildonly:
+            return list(snapshot["server"])
+
+        return snapshot["server"] + snapshot["channels"].get(channel_id, [])
 
     def can(self, perm: str, author: Optional[discord.Member]=None, blacklist_only: bool=False) -> bool:
         if not perm:
@@ -143,34 +221,4 @@ class Permissions(object):
         except AttributeError:
             pass
 
-        perm = perm.strip().lower()
-
-        if "*" in self.perms:
-            return True
-
-        # Negation checks
-
-        negated_perm = "-" + perm
-
-        while "." in negated_perm:
-            if negated_perm in self.perms:
-                return False
-            negated_perm = negated_perm.rsplit(".", 1)[0]
-
-        if negated_perm in self.perms:
-            return False
-
-        # Positive checks
-
-        if blacklist_only:
-            return True
-
-        while "." in perm:
-            if perm in self.perms:
-                return True
-            perm = perm.rsplit(".", 1)[0]
-
-        if perm in self.perms:
-            return True
-
-        return False
+        return self.compiled.check(perm.strip().lower(), blacklist_only)
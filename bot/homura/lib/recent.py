@@ -0,0 +1,38 @@
+# coding=utf-8
+import time
+from typing import Hashable, Iterable
+
+
+class RecentSet(object):
+    """
+    A set that forgets its members after a time window.
+
+    Members go into rotating buckets of `window / buckets` seconds, so expiring them is dropping whole buckets
+    instead of tracking a deadline per member. Members are kept between `window` and `window + window / buckets`
+    seconds.
+    """
+
+    def __init__(self, window: float=120, buckets: int=4):
+        self.width = window / buckets
+        self.buckets = buckets
+        self._buckets = {}
+
+    def __contains__(self, item: Hashable) -> bool:
+        self._rotate()
+        return any(item in bucket for bucket in self._buckets.values())
+
+    def __len__(self):
+        self._rotate()
+        return sum(len(bucket) for bucket in self._buckets.values())
+
+    def add(self, items: Iterable[Hashable]):
+        current = self._rotate()
+        self._buckets.setdefault(current, set()).update(items)
+
+    def _rotate(self) -> int:
+        current = int(time.monotonic() // self.width)
+
+        for index in [index for index in self._buckets if index < current - self.buckets]:
+            del self._buckets[index]
+
+        return current
@@ -0,0 +1,50 @@
+# coding=utf-8
+from typing import Dict, Optional, Tuple
+
+import discord
+
+
+class RoleIndex(object):
+    """
+    Role lookups by ID and by name, per guild.
+
+    A guild's index is built from its roles on the first lookup and dropped on any change to its roles,
+    so lookups stay dict lookups however often they happen between role changes.
+    """
+
+    def __init__(self):
+        self.guilds = {}  # type: Dict[int, Tuple[Dict[int, discord.Role], Dict[str, discord.Role]]]
+
+    @staticmethod
+    def normalise(name: str) -> str:
+        return name.strip().lower()
+
+    def build(self, guild: discord.Guild):
+        by_id = {}
+        by_name = {}
+
+        for role in guild.roles:
+            by_id[role.id] = role
+            # The lowest role wins, like a search through the guild's roles would.
+            by_name.setdefault(self.normalise(role.name), role)
+
+        self.guilds[guild.id] = (by_id, by_name)
+        return self.guilds[guild.id]
+
+    def get(self, guild: discord.Guild, role_idx) -> Optional[discord.Role]:
+        """
+        Finds a role by its ID or its name, ignoring case and surrounding whitespace.
+        """
+        by_id, by_name = self.guilds.get(guild.id) or self.build(guild)
+        role_idx = str(role_idx)
+
+        if role_idx.isdigit() and int(role_idx) in by_id:
+            return by_id[int(role_idx)]
+
+        return by_name.get(self.normalise(role_idx))
+
+    def invalidate(self, guild: discord.Guild):
+        self.guilds.pop(guild.id, None)
+
+    def clear(self):
+        self.guilds.clear()
@@ -0,0 +1,98 @@
+# coding=utf-8
+import asyncio
+import inspect
+import logging
+import math
+from typing import Callable, Hashable
+
+log = logging.getLogger(__name__)
+
+
+class TimerWheel(object):
+    """
+    Hashed timing wheel for large numbers of keyed, coarse timers.
+
+    Scheduling and cancelling are O(1) and the whole wheel is driven by a single loop callback per tick,
+    which only runs while there are timers pending. Timers longer than a full turn of the wheel wait out
+    the extra rounds in their slot.
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, tick: float=1.0, slots: int=512):
+        self.loop = loop
+        self.tick = tick
+        self.slots = [{} for _ in range(slots)]
+        self._position = 0
+        self._where = {}
+        self._handle = None
+
+    def __len__(self):
+        return len(self._where)
+
+    def __contains__(self, key: Hashable):
+        return key in self._where
+
+    def schedule(self, key: Hashable, delay: float, callback: Callable) -> None:
+        """
+        Schedules a callback, replacing any timer already scheduled under the same key.
+
+        :param key: Identifier of the timer, used to cancel it.
+        :param delay: Seconds until the callback fires, rounded up to the wheel's tick.
+        :param callback: Function or coroutine function to call without arguments.
+        """
+        self.cancel(key)
+
+        ticks = max(1, math.ceil(delay / self.tick))
+        slot = (self._position + ticks) % len(self.slots)
+        rounds = (ticks - 1) // len(self.slots)
+
+        self.slots[slot][key] = [rounds, callback]
+        self._where[key] = slot
+
+        if not self._handle:
+            self._handle = self.loop.call_later(self.tick, self._advance)
+
+    def cancel(self, key: Hashable) -> bool:
+        """
+        Cancels a timer.
+
+        :return: True if a timer was pending for the key.
+        """
+        slot = self._where.pop(key, None)
+        if slot is None:
+            return False
+
+        del self.slots[slot][key]
+
+        if not self._where and self._handle:
+            self._handle.cancel()
+            self._handle = None
+
+        return True
+
+    def _advance(self):
+        self._handle = None
+        self._position = (self._position + 1) % len(self.slots)
+
+        due = []
+        slot = self.slots[self._position]
+
+        for key, timer in list(slot.items()):
+            if timer[0]:
+                timer[0] -= 1
+                continue
+
+            del slot[key]
+            del self._where[key]
+            due.append(timer[1])
+
+        if self._where:
+            self._handle = self.loop.call_later(self.tick, self._advance)
+
+        for callback in due:
+            # noinspection PyBroadException
+            try:
+                result = callback()
+                if inspect.isawaitable(result):
+                    asyncio.ensure_future(result, loop=self.loop)
+            except Exception:
+                log.exception("Error running timer callback.")
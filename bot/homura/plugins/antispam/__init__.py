@@ -157,8 +157,8 @@ class AntispamPlugin(PluginBase):
         if not log_channel:
             return
 
-        embed = self.create_antispam_embed(message, reason)
-        await log_channel.send(embed=embed)
+        # Actions taken during a raid are logged ahead of the routine logs of the channel.
+        self.bot.log_queue.send(log_channel, self.create_antispam_embed(message, reason), priority=True)
 
     async def check_lists(self, message):
         if await self.check_list(message, "blacklist"):
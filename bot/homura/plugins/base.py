@@ -70,17 +70,8 @@ class PluginBase(object):
 
         return embed
 
-    @staticmethod
-    def get_role(guild, role_idx):
-        role_idx = str(role_idx)
-
-        return discord.utils.find(
-            lambda role: (
-                role.name.strip().lower() == role_idx.strip().lower() or
-                str(role.id) == role_idx
-            ),
-            guild.roles
-        )
+    def get_role(self, guild, role_idx):
+        return self.bot.roles.get(guild, role_idx)
 
     # Events
 
@@ -16,6 +16,25 @@ from homura.plugins.base import OWNER_IDS
 
 log = logging.getLogger(__name__)
 
+# Handler parameters filled from the invocation, by name.
+INJECTORS = {
+    "self": lambda plugin, message, match: plugin,
+    "bot": lambda plugin, message, match: plugin.bot,
+    "message": lambda plugin, message, match: message,
+    "channel": lambda plugin, message, match: message.channel,
+    "author": lambda plugin, message, match: message.author,
+    "guild": lambda plugin, message, match: message.guild,
+    "user_mentions": lambda plugin, message, match: list(map(message.guild.get_member, message.raw_mentions)),
+    "channel_mentions": lambda plugin, message, match: list(
+        map(message.guild.get_channel, message.raw_channel_mentions)
+    ),
+    "match": lambda plugin, message, match: match,
+    "args": lambda plugin, message, match: match.groups(),
+    "is_owner": lambda plugin, message, match: message.author.id in OWNER_IDS,
+}
+# Built asynchronously and only when the handler asks for them.
+INJECTABLE = set(INJECTORS) | {"permissions", "settings"}
+
 
 def command(
     pattern=None,
@@ -31,6 +50,9 @@ def command(
         patterns = [pattern]
 
     def actual_decorator(func):
+        # Worked out once here rather than on every invocation.
+        injection_plan = [name for name in inspect.signature(func).parameters if name in INJECTABLE]
+
         @wraps(func)
         async def wrapper(self, message):
 
@@ -64,22 +86,12 @@ def command(
 
             self.bot.stats.count("command", function=func.__name__)
 
-            permissions = await Permissions.create(
-                self.bot,
-                message
-            )
-
-            settings = await Settings.from_guild(
-                self.bot,
-                message.guild
-            )
-
-            args = match.groups()
             author = message.author
+            is_owner = author.id in OWNER_IDS
 
             # Bot owner check
 
-            if (owner_only or self.owner_only) and author.id not in OWNER_IDS:
+            if (owner_only or self.owner_only) and not is_owner:
                 log.warning(
                     "%s#%s [%s] has attempted to run owner command `%s`.",
                     author.name,
@@ -103,13 +115,11 @@ def command(
             # Admin check
 
             try:
-                is_admin = (
-                    author.guild_permissions.manage_guild or
-                    author.guild_permissions.administrator or
-                    author.id in OWNER_IDS
-                )
+                is_guild_admin = author.guild_permissions.administrator
+                is_admin = author.guild_permissions.manage_guild or is_guild_admin or is_owner
             except AttributeError:
-                is_admin = author.id in OWNER_IDS
+                is_guild_admin = False
+                is_admin = is_owner
 
             if (requires_admin or self.requires_admin) and not is_admin:
                 await self.bot.send_message_object(
@@ -125,9 +135,14 @@ def command(
                 )
                 return
 
-            # Permissions check
+            # Permissions check, skipped for owners and administrators who would pass it anyway.
 
-            if not permissions.can(permission_name, author, global_command) and author.id not in OWNER_IDS:
+            permissions = None
+
+            if permission_name and not is_owner and not is_guild_admin:
+                permissions = await Permissions.create(self.bot, message)
+
+            if permissions and not permissions.can(permission_name, author, global_command):
                 await self.bot.send_message_object(
                     Message(
                         content="You are not allowed to use this command in this server or channel.",
@@ -150,47 +165,13 @@ def command(
 
             handler_kwargs = {}
 
-            argspec = inspect.signature(func)
-            params = argspec.parameters.copy()
-
-            if params.pop("self", None):
-                handler_kwargs['self'] = self
-
-            if params.pop("bot", None):
-                handler_kwargs['bot'] = self.bot
-
-            if params.pop('message', None):
-                handler_kwargs['message'] = message
-
-            if params.pop('channel', None):
-                handler_kwargs['channel'] = message.channel
-
-            if params.pop('author', None):
-                handler_kwargs['author'] = message.author
-
-            if params.pop('guild', None):
-                handler_kwargs['guild'] = message.guild
-
-            if params.pop('user_mentions', None):
-                handler_kwargs['user_mentions'] = list(map(message.guild.get_member, message.raw_mentions))
-
-            if params.pop('channel_mentions', None):
-                handler_kwargs['channel_mentions'] = list(map(message.guild.get_channel, message.raw_channel_mentions))
-
-            if params.pop('match', None):
-                handler_kwargs['match'] = match
-
-            if params.pop('args', None):
-                handler_kwargs['args'] = args
-
-            if params.pop('permissions', None):
-                handler_kwargs['permissions'] = permissions
-
-            if params.pop('is_owner', None):
-                handler_kwargs['is_owner'] = author.id in OWNER_IDS
-
-            if params.pop('settings', None):
-                handler_kwargs['settings'] = settings
+            for name in injection_plan:
+                if name == "permissions":
+                    handler_kwargs[name] = permissions or await Permissions.create(self.bot, message)
+                elif name == "settings":
+                    handler_kwargs[name] = await Settings.from_guild(self.bot, message.guild)
+                else:
+                    handler_kwargs[name] = INJECTORS[name](self, message, match)
 
             # Command caller
 
@@ -224,7 +205,7 @@ def command(
 
                 # Owner extra info
 
-                if author.id in OWNER_IDS:
+                if is_owner:
                     embed.add_field(
                         name=random.choice([
                             "How you fucked up",
@@ -157,10 +157,7 @@ class EventLogPlugin(PluginBase):
 
         enabled = await self.redis.sismember("channellog:{}:enabled".format(guild.id), event_type)
         if enabled:
-            if isinstance(message, discord.Embed):
-                await log_channel.send(embed=message)
-            else:
-                await log_channel.send(message)
+            self.bot.log_queue.send(log_channel, message)
 
     async def log_member(self, member, joining):
         embed = discord.Embed(
@@ -5,6 +5,7 @@ from itertools import zip_longest
 from homura.lib.structure import CommandError, Message
 from homura.plugins.base import PluginBase
 from homura.plugins.command import command
+from homura.plugins.moderation import purge
 
 log = logging.getLogger(__name__)
 
@@ -13,42 +14,28 @@ class ModerationPlugin(PluginBase):
     requires_admin = True
 
     @command(
-        "purgeuser",
+        "purgeuser(.*)",
         permission_name="mod.purge.user",
-        description="Purges a user's messages from all channels.",
-        usage="purgeuser <@mentions>"
+        description="Purges a user's messages from all channels. Also purges bots, attachments or messages "
+                    "matching a regex when asked to, only from the last hours if given.",
+        usage="purgeuser <@mentions> [bots] [attachments] [hours:<n>] [match:<regex>]"
     )
-    async def cmd_purge(self, message):
-        mentions = [x.id for x in message.mentions]
-
-        if not mentions:
+    async def cmd_purge(self, message, args, channel):
+        predicate, after = purge.parse_options(args[0], [user.id for user in message.mentions])
+        if not predicate:
             return Message("User mention is missing!")
 
-        deleted = 0
-
-        for channel in message.guild.channels:
-            removed = []
-            if str(channel.type) != "text":
-                continue
-
-            async for msg in channel.history(limit=200):
-                if msg.author.id in mentions:
-                    removed.append(msg)
+        status = await channel.send("Purging...")
+        # Purging bots would take the progress message with them.
+        predicate = purge.all_of(predicate, lambda msg: msg.id != status.id)
 
-            if not removed:
-                continue
+        async def progress(engine):
+            await status.edit(content=str(engine))
 
-            deleted = deleted + len(removed)
+        engine = await purge.PurgeEngine(self.bot, predicate, after=after).run(message.guild.text_channels, progress)
+        await status.edit(content=str(engine))
 
-            if len(removed) == 1:
-                await self.bot.delete_message(removed[0])
-                continue
-
-            for messages in zip_longest(*(iter(removed),) * 100):
-                messages = [message for message in messages if message]
-                await self.bot.delete_messages(messages)
-
-        return Message("{} messages removed!".format(deleted))
+        return Message("{} messages removed!".format(engine.deleted))
 
     @command(
         patterns=[
@@ -112,11 +99,8 @@ class ModerationPlugin(PluginBase):
         return Message(f"Role has been {'removed' if role_exists else 'added'}!")
 
     async def on_member_join(self, member):
-        roles = await self.redis.smembers_asset("server:%s:autoroles" % (member.guild.id))
-
-        for role_id in roles:
-            role = self.get_role(member.guild, role_id)
-            if not role:
-                continue
+        role_ids = await self.redis.smembers_asset("server:%s:autoroles" % (member.guild.id))
+        roles = [role for role in (self.get_role(member.guild, role_id) for role_id in role_ids) if role]
 
-            await member.add_roles(role)
+        if roles:
+            await member.add_roles(*roles)
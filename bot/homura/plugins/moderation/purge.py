@@ -0,0 +1,221 @@
+# coding=utf-8
+import asyncio
+import datetime
+import logging
+import os
+import re
+from typing import Awaitable, Callable, Iterable, List, Optional, Tuple
+
+import discord
+
+from homura.lib.structure import CommandError
+from homura.lib.util import validate_regex
+
+log = logging.getLogger(__name__)
+
+# Channels scanned at the same time by a purge.
+PURGE_CONCURRENCY = int(os.environ.get("PURGE_CONCURRENCY", 5))
+# Discord refuses to bulk delete messages older than 14 days, keep a margin for the time the scan takes.
+BULK_MAX_AGE = datetime.timedelta(days=14) - datetime.timedelta(minutes=10)
+# Discord's bulk delete takes at most 100 messages.
+BULK_LIMIT = 100
+# Seconds between progress updates.
+PROGRESS_INTERVAL = 5
+
+# Hours option of purgeuser.
+HOURS_REGEX = re.compile(r"\bhours:(\d+)")
+
+Predicate = Callable[[discord.Message], bool]
+
+
+# Predicates
+
+def by_users(user_ids: Iterable[int]) -> Predicate:
+    user_ids = set(user_ids)
+    return lambda message: message.author.id in user_ids
+
+
+def by_regex(pattern: str) -> Predicate:
+    regex = re.compile(pattern, re.I | re.M)
+    return lambda message: bool(regex.search(message.content))
+
+
+def has_attachments() -> Predicate:
+    return lambda message: bool(message.attachments)
+
+
+def from_bots() -> Predicate:
+    return lambda message: message.author.bot
+
+
+def sent_within(after: Optional[datetime.datetime]=None, before: Optional[datetime.datetime]=None) -> Predicate:
+    return lambda message: (not after or message.created_at >= after) and (not before or message.created_at < before)
+
+
+def any_of(*predicates: Predicate) -> Predicate:
+    return lambda message: any(predicate(message) for predicate in predicates)
+
+
+def all_of(*predicates: Predicate) -> Predicate:
+    return lambda message: all(predicate(message) for predicate in predicates)
+
+
+def parse_options(
+    options: str,
+    user_ids: Iterable[int]=()
+) -> Tuple[Optional[Predicate], Optional[datetime.datetime]]:
+    """
+    Builds the predicate of a purge from its options.
+
+    :param options: Any of "bots", "attachments" and "hours:<n>", then optionally "match:<regex>" taking the rest.
+    :param user_ids: Users whose messages are purged.
+    :return: A tuple of the predicate, None when nothing is targeted, and the time to scan back to.
+    """
+    # The regex takes the rest of the options, the others come before it.
+    options, _, pattern = options.partition("match:")
+    pattern = pattern.strip()
+    flags = options.split()
+
+    targets = []
+    user_ids = list(user_ids)
+
+    if user_ids:
+        targets.append(by_users(user_ids))
+    if "bots" in flags:
+        targets.append(from_bots())
+    if "attachments" in flags:
+        targets.append(has_attachments())
+    if pattern:
+        if not validate_regex(pattern):
+            raise CommandError("That is not a valid regex!")
+        targets.append(by_regex(pattern))
+
+    if not targets:
+        return None, None
+
+    predicate = any_of(*targets)
+    after = None
+
+    hours = HOURS_REGEX.search(options)
+    if hours:
+        after = datetime.datetime.utcnow() - datetime.timedelta(hours=int(hours.group(1)))
+        predicate = all_of(predicate, sent_within(after=after))
+
+    return predicate, after
+
+
+class PurgeEngine(object):
+    """
+    Deletes the messages matching a predicate across many channels.
+
+    Channels are scanned concurrently up to a limit and matches are deleted as the scan goes, in bulk deletes
+    for recent messages and one by one for the ones too old to be bulk deleted.
+    """
+
+    def __init__(
+        self,
+        bot,
+        predicate: Predicate,
+        limit: int=200,
+        after: Optional[datetime.datetime]=None,
+        concurrency: int=PURGE_CONCURRENCY
+    ):
+        """
+        :param bot: The bot, deletions go through it so they are not logged.
+        :param predicate: Function telling if a message should be deleted.
+        :param limit: Messages scanned per channel, counting from the newest.
+        :param after: Stop scanning a channel at the first message sent before this time.
+        :param concurrency: Channels scanned at the same time.
+        """
+        self.bot = bot
+        self.predicate = predicate
+        self.limit = limit
+        self.after = after
+        self.semaphore = asyncio.Semaphore(concurrency)
+
+        self.channels = 0
+        self.channels_done = 0
+        self.scanned = 0
+        self.deleted = 0
+        self.failed = 0
+
+    def __str__(self):
+        return "Scanned {}/{} channels and {} messages, {} removed{}.".format(
+            self.channels_done,
+            self.channels,
+            self.scanned,
+            self.deleted,
+            f", {self.failed} failed" if self.failed else ""
+        )
+
+    async def run(
+        self,
+        channels: List[discord.TextChannel],
+        progress: Optional[Callable[["PurgeEngine"], Awaitable]]=None
+    ) -> "PurgeEngine":
+        """
+        Purges channels.
+
+        :param channels: Channels to purge.
+        :param progress: Coroutine function called with the engine every few seconds while the purge runs.
+        """
+        self.channels = len(channels)
+        scans = asyncio.gather(*[self.scan(channel) for channel in channels])
+
+        while progress:
+            done, _ = await asyncio.wait([scans], timeout=PROGRESS_INTERVAL)
+            if done:
+                break
+
+            try:
+                await progress(self)
+            except discord.HTTPException:
+                log.warning("Unable to report purge progress.")
+
+        await scans
+        return self
+
+    async def scan(self, channel: discord.TextChannel):
+        async with self.semaphore:
+            pending = []
+
+            try:
+                # Newest first like the channel reads, discord.py would page forward from `after` if it was given.
+                async for message in channel.history(limit=self.limit):
+                    if self.after and message.created_at <= self.after:
+                        break
+
+                    self.scanned += 1
+
+                    if not self.predicate(message):
+                        continue
+
+                    if message.created_at < datetime.datetime.utcnow() - BULK_MAX_AGE:
+                        await self.delete([message])
+                        continue
+
+                    pending.append(message)
+                    if len(pending) == BULK_LIMIT:
+                        await self.delete(pending)
+                        pending = []
+
+                if pending:
+                    await self.delete(pending)
+            except discord.Forbidden:
+                log.debug("Skipping channel %s, no access.", channel.id)
+
+            self.channels_done += 1
+
+    async def delete(self, messages: List[discord.Message]):
+        try:
+            if len(messages) == 1:
+                await self.bot.delete_message(messages[0])
+            else:
+                await self.bot.delete_messages(messages)
+
+            self.deleted += len(messages)
+        except discord.NotFound:
+            pass
+        except discord.HTTPException as e:
+            log.warning("Unable to delete %s messages: %s", len(messages), e)
+            self.failed += len(messages)
@@ -34,6 +34,14 @@ class MusicPlugin(MusicCommands):
                 await self.get_player(voice_channel.guild)
             await self.bot.redis.spop("music:reload")
 
+    async def on_voice_state_update(self, member, before, after):
+        if before.channel == after.channel:
+            return
+
+        player = self.players.get(member.guild.id)
+        if player:
+            self.idle.check(player)
+
     async def on_logout(self):
         log.info("Got logout event!")
         await self.cleanup_players()
@@ -42,6 +50,7 @@ class MusicPlugin(MusicCommands):
 
     async def on_player_play(self, player, entry):
         player.skip_state.reset()
+        await self.history.record(player.guild, entry)
 
         channel = entry.meta.get("channel", None)
         author = entry.meta.get("author", None)
@@ -1,5 +1,4 @@
 # coding=utf-8
-import asyncio
 import os
 
 import discord
@@ -7,8 +6,13 @@ import discord
 from homura.lib.structure import CommandError
 from homura.plugins.base import PluginBase
 from homura.plugins.music.downloader import Downloader
+from homura.plugins.music.expiry import MediaRefresher
+from homura.plugins.music.history import PlayHistory
+from homura.plugins.music.hub import StreamHub
+from homura.plugins.music.idle import IdleManager
 from homura.plugins.music.player import Player
 from homura.plugins.music.playlist import Playlist
+from homura.plugins.music.seekindex import SeekIndex
 
 
 class MusicBase(PluginBase):
@@ -17,30 +21,12 @@ class MusicBase(PluginBase):
 
         self.players = {}
         self.downloader = Downloader(self.bot, os.environ.get("AUDIO_CACHE_PATH", "audio_cache"))
-        self.loop.create_task(self.inactive_purger())
-
-    async def inactive_purger(self):
-        checks = {}
-
-        while True:
-            for guild_id, player in self.players.copy().items():
-                if guild_id not in checks:
-                    checks[guild_id] = 0
-
-                # Nobody has joined for almost two minutes, bye client!
-                if checks[guild_id] == 3:
-                    checks[guild_id] = 0
-                    await self.cleanup_player(player)
-                    continue
-
-                if len(player.voice_client.channel.members) == 1:
-                    # We are the only one in the channel, strike!
-                    checks[guild_id] += 1
-                else:
-                    # Reset the counter if there is more people than us.
-                    checks[guild_id] = 0
-
-            await asyncio.sleep(60)
+        self.seek_index = SeekIndex(self.bot)
+        self.stream_hub = StreamHub()
+        self.history = PlayHistory(self.bot)
+        self.idle = IdleManager(self)
+        self.refresher = MediaRefresher(self)
+        self.loop.create_task(self.refresher.run())
 
     @staticmethod
     def create_voice_embed(description=None, colour=discord.Colour.blue(), title=None):
@@ -77,8 +63,11 @@ class MusicBase(PluginBase):
 
             playlist = Playlist(self, guild)
             player = Player(self, playlist, voice_client)\
-                .on("play", self.on_player_play)
+                .on("play", self.on_player_play)\
+                .on("pause", self.idle.check)\
+                .on("resume", self.idle.check)
             self.players[guild.id] = player
+            self.idle.check(player)
 
             return player
 
@@ -90,6 +79,7 @@ class MusicBase(PluginBase):
             player.kill()
             await player.voice_client.disconnect()
         finally:
+            self.idle.forget(player.guild.id)
             del self.players[player.guild.id]
 
     async def cleanup_players(self):
@@ -2,7 +2,6 @@
 import asyncio
 import logging
 import math
-import random
 import re
 import time
 import traceback
@@ -500,9 +499,38 @@ class MusicCommands(MusicBase):
         else:
             prepend = False
 
-        song_url = random.choice(list(self.bot.stats.query('select sample("value", 15), url from music_play').get_points()))["url"]
+        song_url = await self.history.random(message.guild)
+        if not song_url:
+            raise CommandError("No songs have been played yet!")
+
         return await self.play._func(self, message, ["prepend" if prepend else "play", song_url])
 
+    @command(
+        patterns=[
+            "music top$",
+            "music top (global)$"
+        ],
+        permission_name="music.info.top",
+        global_command=True,
+        description="Lists the most played songs",
+        usage="music top [global]"
+    )
+    async def top(self, message, args):
+        guild = None if args else message.guild
+        songs = await self.history.top(guild)
+
+        if not songs:
+            raise CommandError("No songs have been played yet!")
+
+        lines = []
+        for i, song in enumerate(songs, 1):
+            lines.append(f"{i}. [{sanitize(song['title'])}]({song['url']}) - {song['plays']} plays")
+
+        return Message(embed=self.create_voice_embed(
+            title="Most played" + (" globally" if args else ""),
+            description="\n".join(lines)
+        ))
+
     async def play_playlist_async(self, player, channel, author, playlist_url, extractor_type):
         info = await self.downloader.extract_info(player.playlist.loop, playlist_url, download=False, process=False)
 
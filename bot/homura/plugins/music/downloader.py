@@ -4,12 +4,14 @@ import functools
 import hashlib
 import json
 import os
+import time
 import urllib.parse
 from concurrent.futures import ThreadPoolExecutor
 
 import youtube_dl
 
 from homura.lib.util import md5_string
+from homura.plugins.music.expiry import REFRESH_MARGIN, get_info_expiry
 
 YOUTUBEDL_ARGS = {
     "format": "bestaudio/best",
@@ -29,6 +31,14 @@ YOUTUBEDL_ARGS = {
 CACHE_TIME = 60 * 60 * 24  # 60s * 60m * 24h = 1 day
 LIVE_CACHE_TIME = 60 * 60   # 60s * 60m = 1 hour
 
+# Extractors that hand out media URLs which expire long before a day is up.
+EXTRACTOR_CACHE_TIME = {
+    "youtube": 60 * 60 * 5,     # 60s * 60m * 5h = 5 hours
+    "twitch:stream": 60 * 10,   # 60s * 10m = 10 minutes
+    "twitch:vod": 60 * 60,      # 60s * 60m = 1 hour
+    "soundcloud": 60 * 30,      # 60s * 30m = 30 minutes
+}
+
 youtube_dl.utils.bug_reports_message = lambda: ""
 
 
@@ -48,12 +58,35 @@ class Downloader(object):
 
         return ytdl
 
+    @staticmethod
+    def get_cache_time(data: dict, is_live: bool=False) -> int:
+        """
+        Gets how long extract_info data can be cached for.
+
+        The time is capped by the extractor's limit and by the expiry of any media URL in the data, so a
+        cached result is never served with a media URL that is about to stop working.
+
+        :param data: Data to cache
+        :param is_live: The data is for a live stream.
+        """
+        cache_time = EXTRACTOR_CACHE_TIME.get(
+            data.get("extractor"),
+            LIVE_CACHE_TIME if is_live else CACHE_TIME
+        )
+
+        expiry = get_info_expiry(data)
+        if expiry:
+            cache_time = min(cache_time, int(expiry - time.time() - REFRESH_MARGIN))
+
+        return cache_time
+
     async def set_cache(self, url: str, data: dict, is_live: bool=False, **kwargs) -> None:
         """
-        Sets cached data into Redis for extract_info for one day.
+        Sets cached data into Redis for extract_info.
 
         :param url: URL of the video to set in the cache
         :param data: Data to cache
+        :param is_live: The data is for a live stream.
         :param kwargs: extract_info kwargs. process is True = ":processed" appended to cache key
         :return:
         """
@@ -66,10 +99,14 @@ class Downloader(object):
         if "process" in kwargs and kwargs["process"] is True:
             cachekey += ":processed"
 
+        cache_time = self.get_cache_time(data, is_live)
+        if cache_time <= 0:
+            return None
+
         try:
             await self.bot.redis.setex(
                 cachekey,
-                (LIVE_CACHE_TIME if is_live else CACHE_TIME),
+                cache_time,
                 json.dumps(data)
             )
         except TypeError:
@@ -120,16 +157,18 @@ class Downloader(object):
 
         return False
 
-    async def extract_info(self, loop, *args, on_error=None, **kwargs):
+    async def extract_info(self, loop, *args, on_error=None, refresh=False, **kwargs):
         """
             Runs ytdl.extract_info within the threadpool. Returns a future that will fire when it's done.
             If `on_error` is passed and an exception is raised, the exception will be caught and passed to
             on_error as an argument.
+            If `refresh` is True, the cache is skipped and replaced with the new result.
         """
 
-        info = await self.get_cache(args[0], **kwargs)
-        if info:
-            return info
+        if not refresh:
+            info = await self.get_cache(args[0], **kwargs)
+            if info:
+                return info
 
         try:
             info = await loop.run_in_executor(self.thread_pool, functools.partial(self.ytdl.extract_info, *args, **kwargs))
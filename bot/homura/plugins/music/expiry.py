@@ -0,0 +1,94 @@
+# coding=utf-8
+import asyncio
+import datetime
+import json
+import logging
+import time
+import urllib.parse
+from itertools import islice
+from typing import Optional
+
+from homura.plugins.music.exceptions import ExtractionError
+
+log = logging.getLogger(__name__)
+
+REFRESH_INTERVAL = 60
+# Media URLs expiring within this many seconds are resolved again.
+REFRESH_MARGIN = 60 * 10  # 60s * 10m = 10 minutes
+# Number of upcoming entries of each queue that are kept fresh.
+REFRESH_LOOKAHEAD = 3
+
+
+def get_expiry(url: str) -> Optional[float]:
+    """
+    Parses the expiry time out of a signed media URL.
+
+    :param url: Media URL as returned by youtube-dl.
+    :return: Unix timestamp the URL stops working at, or None if the URL does not say.
+    """
+    if not url:
+        return None
+
+    pieces = urllib.parse.urlparse(url)
+    params = urllib.parse.parse_qs(pieces.query)
+
+    try:
+        # googlevideo.com and most signed CDNs (CloudFront, Akamai) use an absolute timestamp.
+        for name in ("expire", "Expires", "expires"):
+            if name in params:
+                return float(params[name][0])
+
+        # googlevideo.com also puts the parameters in the path for some formats, /expire/1530000000/...
+        segments = pieces.path.split("/")
+        if "expire" in segments[:-1]:
+            return float(segments[segments.index("expire") + 1])
+
+        # S3 presigned URLs are relative to their signing date.
+        if "X-Amz-Date" in params and "X-Amz-Expires" in params:
+            signed = datetime.datetime.strptime(params["X-Amz-Date"][0], "%Y%m%dT%H%M%SZ")
+            signed = signed.replace(tzinfo=datetime.timezone.utc).timestamp()
+            return signed + float(params["X-Amz-Expires"][0])
+
+        # Twitch playlists carry a JSON access token.
+        if "token" in params:
+            return float(json.loads(params["token"][0])["expires"])
+    except (ValueError, IndexError, KeyError, TypeError):
+        pass
+
+    return None
+
+
+def get_info_expiry(info: dict) -> Optional[float]:
+    """Gets the earliest expiry of the media URLs in an extract_info result."""
+    urls = [info.get("url")] + [media.get("url") for media in info.get("formats", None) or []]
+    expiries = [expiry for expiry in map(get_expiry, urls) if expiry]
+
+    return min(expiries) if expiries else None
+
+
+class MediaRefresher(object):
+    """Resolves the media URLs of upcoming queue entries again before they expire."""
+
+    def __init__(self, plugin):
+        self.plugin = plugin
+
+    async def run(self):
+        while True:
+            await asyncio.sleep(REFRESH_INTERVAL)
+            await self.refresh_all()
+
+    async def refresh_all(self):
+        for player in list(self.plugin.players.values()):
+            for entry in islice(player.playlist.entries, REFRESH_LOOKAHEAD):
+                if not entry.needs_refresh(REFRESH_MARGIN):
+                    continue
+
+                log.debug("Refreshing media URL for %s, expires in %ss", entry.url, entry.expires - time.time())
+
+                # Errors are kept to the entry, the loop has to keep going for every later one.
+                try:
+                    await entry.refresh()
+                except ExtractionError as e:
+                    log.warning("Failed to refresh media URL for %s: %s", entry.url, e.message)
+                except Exception:
+                    log.exception("Error refreshing media URL for %s", entry.url)
@@ -0,0 +1,202 @@
+# coding=utf-8
+import logging
+import random
+import time
+from typing import List, Optional
+
+log = logging.getLogger(__name__)
+
+META_KEY = "music:history:meta"
+GLOBAL_SCOPE = "global"
+
+
+class WeightedSampler(object):
+    """
+    Play counts of URLs in a Fenwick tree.
+
+    Incrementing a count and drawing a URL with probability proportional to its count are both O(log n).
+    """
+
+    def __init__(self):
+        self.items = []
+        self.counts = []
+        self._index = {}
+        self._tree = [0]
+
+    def __len__(self):
+        return len(self.items)
+
+    @property
+    def total(self) -> int:
+        return self._prefix(len(self.items))
+
+    def increment(self, item: str, amount: int=1):
+        if item not in self._index:
+            self._index[item] = len(self.items)
+            self.items.append(item)
+            self.counts.append(0)
+
+            # Grow the tree by doubling so the rebuilds stay amortised O(1).
+            if len(self.items) >= len(self._tree):
+                self._rebuild(len(self._tree) * 2)
+
+        i = self._index[item]
+        self.counts[i] += amount
+
+        i += 1
+        while i < len(self._tree):
+            self._tree[i] += amount
+            i += i & -i
+
+    def sample(self, rng: random.Random=random) -> Optional[str]:
+        total = self.total
+        if total <= 0:
+            return None
+
+        remaining = rng.random() * total
+        position = 0
+        step = 1 << (len(self._tree) - 1).bit_length()
+
+        while step:
+            following = position + step
+            if following < len(self._tree) and self._tree[following] <= remaining:
+                position = following
+                remaining -= self._tree[following]
+            step >>= 1
+
+        return self.items[min(position, len(self.items) - 1)]
+
+    def _prefix(self, i: int) -> int:
+        total = 0
+        while i > 0:
+            total += self._tree[i]
+            i -= i & -i
+        return total
+
+    def _rebuild(self, size: int):
+        self._tree = [0] * size
+        for i, count in enumerate(self.counts, 1):
+            j = i
+            while j < size:
+                self._tree[j] += count
+                j += j & -j
+
+
+class PlayHistory(object):
+    """
+    Index of played songs, per guild and bot-wide.
+
+    Play counts and last played times live in Redis sorted sets so top played lookups are a ZREVRANGE, and
+    title/duration are kept in a hash shared by every scope. Weighted random picks for `!music surprise` are
+    served from samplers loaded once per scope and updated as songs are played.
+    """
+
+    def __init__(self, bot):
+        self.bot = bot
+        self._samplers = {}
+
+    @property
+    def redis(self):
+        return self.bot.redis
+
+    @staticmethod
+    def plays_key(scope: str) -> str:
+        return f"music:history:{scope}:plays"
+
+    @staticmethod
+    def last_played_key(scope: str) -> str:
+        return f"music:history:{scope}:last"
+
+    @staticmethod
+    def scopes(guild) -> List[str]:
+        return [GLOBAL_SCOPE, str(guild.id)] if guild else [GLOBAL_SCOPE]
+
+    async def record(self, guild, entry):
+        """
+        Records a play of an entry.
+
+        :param guild: Guild the entry has been played in.
+        :param entry: The playlist entry that started playing.
+        """
+        now = time.time()
+
+        # One round trip for the metadata and the counts of every scope.
+        transaction = await self.redis.multi()
+        await transaction.hset(META_KEY, entry.url, {
+            "title": entry.title,
+            "duration": entry.duration or 0
+        })
+
+        for scope in self.scopes(guild):
+            await transaction.zincrby(self.plays_key(scope), 1, entry.url)
+            await transaction.zadd(self.last_played_key(scope), {entry.url: now})
+
+        await transaction.exec()
+
+        for scope in self.scopes(guild):
+            if scope in self._samplers:
+                self._samplers[scope].increment(entry.url)
+
+    async def _get_sampler(self, scope: str) -> WeightedSampler:
+        if scope in self._samplers:
+            return self._samplers[scope]
+
+        sampler = WeightedSampler()
+        plays = await self.redis.zrange_asdict(self.plays_key(scope))
+
+        for url, count in plays.items():
+            sampler.increment(url, int(count))
+
+        # Another pick could have loaded the scope while we were waiting on Redis.
+        return self._samplers.setdefault(scope, sampler)
+
+    async def random(self, guild=None) -> Optional[str]:
+        """
+        Picks a random song weighted by how often it has been played.
+
+        :param guild: Prefer songs played in this guild, falling back to every song the bot has played.
+        :return: The URL of the song or None if nothing has been played yet.
+        """
+        for scope in reversed(self.scopes(guild)):
+            url = (await self._get_sampler(scope)).sample()
+            if url:
+                return url
+
+        return None
+
+    async def top(self, guild=None, limit: int=10) -> List[dict]:
+        """
+        Gets the most played songs.
+
+        :param guild: Guild to get the songs of, None for every song the bot has played.
+        :param limit: Number of songs to return.
+        :return: A list of dicts with the url, title, duration, plays and last_played of each song.
+        """
+        scope = str(guild.id) if guild else GLOBAL_SCOPE
+
+        plays = await self.redis.zrevrange_asdict(self.plays_key(scope), 0, limit - 1)
+        if not plays:
+            return []
+
+        urls = list(plays.keys())
+        metas = await self.redis.hmget_aslist(META_KEY, urls)
+
+        # The last played times of every song in one round trip, the replies come in with the EXEC.
+        transaction = await self.redis.multi()
+        scores = [await transaction.zscore(self.last_played_key(scope), url) for url in urls]
+        await transaction.exec()
+
+        songs = []
+        for url, meta, score in zip(urls, metas, scores):
+            meta = meta or {}
+            last_played = await score
+
+            songs.append({
+                "url": url,
+                "title": meta.get("title", url),
+                "duration": meta.get("duration", 0),
+                "plays": int(plays[url]),
+                "last_played": last_played
+            })
+
+        return sorted(songs, key=lambda song: song["plays"], reverse=True)
@@ -0,0 +1,197 @@
+# coding=utf-8
+import logging
+import queue
+import subprocess
+import threading
+
+import discord
+
+log = logging.getLogger(__name__)
+
+# Frames buffered per listener, 250 * 20ms = 5 seconds of audio. The decode waits for listeners with a full buffer.
+RING_SIZE = 250
+# How long the decode waits on a full listener before it is treated as stalled, a paused player for instance.
+# Stalled listeners drop their oldest frames instead of holding up the others until they catch up.
+FEED_TIMEOUT = 1
+# How long a listener waits for the next frame before treating the stream as dead.
+READ_TIMEOUT = 10
+
+
+class SharedStreamSource(discord.AudioSource):
+    """A listener of a shared stream. Frames are handed over by the decode thread through a bounded queue."""
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.stalled = False
+        self._buffer = queue.Queue(maxsize=RING_SIZE)
+
+    def feed(self, frame):
+        """
+        Hands a frame, or None at the end of the stream, to the listener. Blocks while the listener's buffer
+        is full, which paces the decode to the listeners.
+        """
+        if self.stalled and self._buffer.qsize() < RING_SIZE // 2:
+            self.stalled = False
+
+        if not self.stalled:
+            try:
+                self._buffer.put(frame, timeout=FEED_TIMEOUT)
+                return
+            except queue.Full:
+                log.debug("Listener of shared stream %s stalled, dropping its oldest frames.", self.stream.key)
+                self.stalled = True
+
+        try:
+            self._buffer.get_nowait()
+        except queue.Empty:
+            pass
+
+        self._buffer.put_nowait(frame)
+
+    def read(self):
+        try:
+            frame = self._buffer.get(timeout=READ_TIMEOUT)
+        except queue.Empty:
+            return b""
+
+        if frame is None:
+            # Keep the end of the stream for any later read.
+            self._buffer.put_nowait(None)
+            return b""
+
+        return frame
+
+    def is_opus(self):
+        return False
+
+    def cleanup(self):
+        self.stream.unsubscribe(self)
+
+
+class SharedStream(object):
+    """A single ffmpeg decode of a live source, fanned out to every listener of it."""
+
+    def __init__(self, hub, key, source_url):
+        self.hub = hub
+        self.key = key
+        self.source_url = source_url
+        self.listeners = []
+        self.closed = False
+        self._lock = threading.Lock()
+
+        # -re reads the source at its own pace, so a source that is not quite live does not burst through.
+        self._process = subprocess.Popen(
+            [
+                "ffmpeg", "-nostdin", "-re",
+                "-reconnect", "1", "-reconnect_streamed", "1", "-reconnect_delay_max", "5",
+                "-i", source_url,
+                "-f", "s16le", "-ar", "48000", "-ac", "2", "-loglevel", "warning",
+                "pipe:1"
+            ],
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.PIPE
+        )
+
+        # Started with the first listener so it gets the stream from its first frame.
+        self._thread = threading.Thread(target=self._decode, name=f"stream-hub:{key}", daemon=True)
+
+    def _decode(self):
+        frame_size = discord.opus.Encoder.FRAME_SIZE
+
+        while True:
+            frame = self._process.stdout.read(frame_size)
+            if len(frame) != frame_size:
+                break
+
+            with self._lock:
+                listeners = list(self.listeners)
+
+            # Outside of the lock, feeding waits on full listeners and those have to be able to unsubscribe.
+            for listener in listeners:
+                listener.feed(frame)
+
+        log.debug("Shared stream %s has ended.", self.key)
+        self._process.wait()
+
+        with self._lock:
+            self.closed = True
+            listeners = list(self.listeners)
+
+        for listener in listeners:
+            listener.feed(None)
+
+        self.hub.release(self)
+
+    def subscribe(self):
+        """
+        Adds a listener to the stream.
+
+        :return: The listener, or None if the stream has already ended.
+        """
+        with self._lock:
+            if self.closed:
+                return None
+
+            listener = SharedStreamSource(self)
+            self.listeners.append(listener)
+
+            if not self._thread.is_alive() and not self._thread.ident:
+                self._thread.start()
+
+        return listener
+
+    def unsubscribe(self, listener):
+        with self._lock:
+            if listener in self.listeners:
+                self.listeners.remove(listener)
+
+            if self.listeners or self.closed:
+                return
+
+            self.closed = True
+
+        log.debug("Last listener left shared stream %s, stopping ffmpeg.", self.key)
+        self.hub.release(self)
+        self._kill()
+
+    def _kill(self):
+        try:
+            self._process.kill()
+            self._process.communicate()
+        except OSError:
+            log.warning("Failed to kill ffmpeg for shared stream %s.", self.key)
+
+
+class StreamHub(object):
+    """
+    Shares one ffmpeg process between every guild playing the same live stream.
+
+    Listeners get their own ring buffer of PCM so each guild keeps its own volume transform, and the decode
+    is torn down once the last listener's source is cleaned up by its voice client.
+    """
+
+    def __init__(self):
+        self.streams = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, key: str, source_url: str) -> SharedStreamSource:
+        """
+        Gets a listener for a live source, starting a decode for it if nobody is listening yet.
+
+        :param key: Identifier of the stream shared between guilds, usually the URL the users have queued.
+        :param source_url: The resolved media URL to hand to ffmpeg when a new decode is needed.
+        """
+        with self._lock:
+            stream = self.streams.get(key)
+            listener = stream.subscribe() if stream else None
+
+            if not listener:
+                stream = self.streams[key] = SharedStream(self, key, source_url)
+                listener = stream.subscribe()
+
+        return listener
+
+    def release(self, stream: SharedStream):
+        with self._lock:
+            if self.streams.get(stream.key) is stream:
+                del self.streams[stream.key]
@@ -0,0 +1,82 @@
+# coding=utf-8
+import functools
+import logging
+import os
+import time
+
+from homura.lib.timerwheel import TimerWheel
+
+log = logging.getLogger(__name__)
+
+# Seconds the bot stays in a voice channel with nobody listening.
+ALONE_TIMEOUT = int(os.environ.get("MUSIC_ALONE_TIMEOUT", 60))
+# Seconds a paused player is kept around before it is shut down.
+PAUSED_TIMEOUT = int(os.environ.get("MUSIC_PAUSED_TIMEOUT", 60 * 15))
+
+
+class IdleManager(object):
+    """
+    Disconnects idle voice clients.
+
+    Players are re-evaluated when someone joins or leaves their channel and when they are paused or resumed,
+    and an idle player gets a timer on the wheel instead of being polled.
+    """
+
+    def __init__(self, plugin):
+        self.plugin = plugin
+        self.wheel = TimerWheel(plugin.loop)
+        self.idle_since = {}
+
+    @property
+    def stats(self):
+        return self.plugin.bot.stats
+
+    @staticmethod
+    def is_alone(player) -> bool:
+        channel = player.voice_client.channel
+        if not channel:
+            return True
+
+        return not any(not member.bot for member in channel.members)
+
+    def check(self, player):
+        guild_id = player.guild.id
+
+        if self.is_alone(player):
+            reason, timeout = "alone", ALONE_TIMEOUT
+        elif player.is_paused:
+            reason, timeout = "paused", PAUSED_TIMEOUT
+        else:
+            self._mark_active(guild_id)
+            return
+
+        # Keep the running timer if the player is still idle for the same reason.
+        if guild_id in self.wheel and self.idle_since.get(guild_id, (None,))[0] == reason:
+            return
+
+        self.idle_since[guild_id] = (reason, time.time())
+        self.wheel.schedule(guild_id, timeout, functools.partial(self.reap, guild_id))
+        self.stats.count("music_idle", action="idle", reason=reason)
+
+    def forget(self, guild_id: int):
+        self.wheel.cancel(guild_id)
+        self.idle_since.pop(guild_id, None)
+
+    def _mark_active(self, guild_id: int):
+        self.wheel.cancel(guild_id)
+
+        if guild_id in self.idle_since:
+            reason, since = self.idle_since.pop(guild_id)
+            self.stats.count("music_idle", action="active", reason=reason, count=float(time.time() - since))
+
+    async def reap(self, guild_id: int):
+        reason, since = self.idle_since.pop(guild_id, (None, time.time()))
+        player = self.plugin.players.get(guild_id)
+
+        if not player:
+            return
+
+        log.info("Disconnecting idle player in guild %s (%s).", guild_id, reason)
+        self.stats.count("music_idle", action="reap", reason=reason, count=float(time.time() - since))
+
+        await self.plugin.cleanup_player(player)
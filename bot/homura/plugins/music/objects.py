@@ -3,10 +3,12 @@ import asyncio
 import json
 import logging
 import os
+import time
 import traceback
 
 from homura.lib.util import get_header, md5_file
 from homura.plugins.music.exceptions import ExtractionError
+from homura.plugins.music.expiry import get_expiry
 
 log = logging.getLogger(__name__)
 
@@ -30,6 +32,18 @@ class BasePlaylistEntry(object):
     def seekable(self):
         return self._seekable
 
+    @property
+    def expires(self):
+        """Unix time the resolved media URL stops working at, None if it does not expire."""
+        return None
+
+    def needs_refresh(self, margin=0):
+        expires = self.expires
+        return expires is not None and expires - time.time() < margin
+
+    async def refresh(self):
+        pass
+
     @classmethod
     def from_json(cls, playlist, jsonstring):
         raise NotImplementedError
@@ -207,6 +221,9 @@ class URLPlaylistEntry(BasePlaylistEntry):
                 else:
                     await self._really_download()
 
+            # Index long files in the background so seeking them later is cheap.
+            asyncio.ensure_future(self.playlist.plugin.seek_index.build(self.filename, self.duration))
+
             # Trigger ready callbacks.
             self._for_each_future(lambda future: future.set_result(self))
 
@@ -247,13 +264,15 @@ class URLPlaylistEntry(BasePlaylistEntry):
 
 
 class StreamPlaylistEntry(BasePlaylistEntry):
-    def __init__(self, playlist, url, title, *, destination=None, **meta):
+    def __init__(self, playlist, url, title, *, destination=None, is_live=False, **meta):
         super().__init__()
 
         self.playlist = playlist
         self.url = url
         self.title = title
         self.destination = destination
+        # Only live streams are shared between guilds, anything else has to be played from its start.
+        self.is_live = is_live
         self.duration = 0
         self.seek = 0
         self.meta = meta
@@ -261,6 +280,21 @@ class StreamPlaylistEntry(BasePlaylistEntry):
         if self.destination:
             self.filename = self.destination
 
+    @property
+    def is_downloaded(self):
+        # Resolve the stream again when we get to it if the media URL has expired in the queue.
+        if self.needs_refresh():
+            return False
+
+        return super().is_downloaded
+
+    @property
+    def expires(self):
+        return get_expiry(self.filename)
+
+    async def refresh(self):
+        await self._download(refresh=True)
+
     @classmethod
     def from_json(cls, playlist, jsonstring):
         data = json.loads(jsonstring)
@@ -269,6 +303,7 @@ class StreamPlaylistEntry(BasePlaylistEntry):
         title = data['title']
         destination = data['destination']
         filename = data['filename']
+        is_live = data.get('is_live', False)
         meta = {}
 
         # TODO: Better [name] fallbacks
@@ -279,9 +314,9 @@ class StreamPlaylistEntry(BasePlaylistEntry):
         if 'author' in data['meta']:
             meta['author'] = meta['channel'].guild.get_member(data['meta']['author']['id'])
 
-        entry = cls(playlist, url, title, destination=destination, **meta)
+        entry = cls(playlist, url, title, destination=destination, is_live=is_live, **meta)
         if not destination and filename:
-            entry.filename = destination
+            entry.filename = filename
 
         return entry
 
@@ -293,6 +328,7 @@ class StreamPlaylistEntry(BasePlaylistEntry):
             'filename': self.filename,
             'title': self.title,
             'destination': self.destination,
+            'is_live': self.is_live,
             'meta': {
                 i: {
                     'type': self.meta[i].__class__.__name__,
@@ -305,21 +341,28 @@ class StreamPlaylistEntry(BasePlaylistEntry):
         return json.dumps(data, indent=2 if pretty else None)
 
     # noinspection PyMethodOverriding
-    async def _download(self, *, fallback=False):
+    async def _download(self, *, fallback=False, refresh=False):
         self._is_downloading = True
 
         url = self.destination if fallback else self.url
 
         try:
-            result = await self.playlist.downloader.extract_info(self.playlist.loop, url, download=False)
-            log.info(result)
+            result = await self.playlist.downloader.extract_info(
+                self.playlist.loop,
+                url,
+                download=False,
+                refresh=refresh
+            )
+            log.debug(result)
         except Exception as e:
             if not fallback and self.destination:
-                return await self._download(fallback=True)
+                return await self._download(fallback=True, refresh=refresh)
 
+            self._for_each_future(lambda future: future.set_exception(ExtractionError(e)))
             raise ExtractionError(e)
         else:
             self.filename = result.get('url', url)
+            self._for_each_future(lambda future: future.set_result(self))
             # I might need some sort of events or hooks or shit
             # for when ffmpeg inevitebly fucks up and i have to restart
             # although maybe that should be at a slightly lower level
@@ -10,10 +10,14 @@ from typing import Optional
 import discord
 
 from homura.lib.eventemitter import EventEmitter
-from homura.plugins.music.objects import SkipState
+from homura.plugins.music.objects import SkipState, StreamPlaylistEntry
+from homura.plugins.music.seekindex import SeekIndex
 
 log = logging.getLogger(__name__)
 
+# 48KHz 16-bit stereo PCM, which is what FFmpegPCMAudio hands to the voice client.
+PCM_BYTES_PER_SECOND = discord.opus.Encoder.SAMPLING_RATE * discord.opus.Encoder.SAMPLE_SIZE
+
 
 class MusicPlayerState(Enum):
     STOPPED = 0  # When the player isn't playing anything
@@ -27,15 +31,21 @@ class MusicPlayerState(Enum):
 
 
 class HellPCMVolumeTransformer(discord.PCMVolumeTransformer):
-    def __init__(self, *args, **kwargs):
-        self.frame_count = 0
-        super().__init__(*args, **kwargs)
+    def __init__(self, original, volume=1.0, start=0.0):
+        self.bytes_read = 0
+        self.start = start
+        super().__init__(original, volume)
 
     def read(self):
-        self.frame_count += 1
         ret = self.original.read()
+        self.bytes_read += len(ret)
         return audioop.mul(ret, 2, self._volume)
 
+    @property
+    def position(self) -> float:
+        """Playback position in seconds, counted from the PCM that has actually been consumed."""
+        return self.start + self.bytes_read / PCM_BYTES_PER_SECOND
+
 
 class Player(EventEmitter):
     def __init__(self, plugin, playlist, voice_client: discord.VoiceClient):
@@ -82,12 +92,51 @@ class Player(EventEmitter):
         if (time > entry.duration) and entry.duration != 0:
             raise ValueError("Seek length is longer than the video.")
 
-        if entry:
-            entry.seek = time
-            entry.quiet = True
-            self.playlist.entries.appendleft(entry)
-            self.loop.create_task(self.plugin.bot.redis.lpush(self.playlist.queue_key, [entry.to_json()]))
-            self.voice_client.stop()
+        entry.seek = time
+        self.loop.create_task(self._seek(entry, time))
+
+    async def _seek(self, entry, position):
+        with await self._play_lock:
+            # The song could have changed while we were waiting for the lock.
+            if entry is not self._current_entry or not self.voice_client.source:
+                return
+
+            old_source = self.voice_client.source
+            self.voice_client.source = await self._create_source(entry, position)
+            old_source.cleanup()
+
+            # Swapping the source resumes the audio player, keep it paused if it was.
+            if self.is_paused:
+                self.voice_client.pause()
+
+    async def _create_source(self, entry, position=0):
+        # Live streams are decoded once and shared between every guild listening to them. Other streams are played
+        # from their start like any other entry.
+        if isinstance(entry, StreamPlaylistEntry) and entry.is_live:
+            source = self.plugin.stream_hub.subscribe(entry.url, entry.filename)
+            return HellPCMVolumeTransformer(source, volume=self.volume)
+
+        before_options = "-nostdin"
+        options = None
+
+        if position and entry.seekable:
+            keyframes = await self.plugin.seek_index.get(entry.filename)
+            keyframe = SeekIndex.lookup(keyframes, position) if keyframes else position
+
+            # Seek the input so ffmpeg jumps instead of decoding everything up to the position.
+            before_options += " -ss {:.3f}".format(keyframe)
+
+            # Decode the last few seconds between the indexed keyframe and the position.
+            if position > keyframe:
+                options = "-ss {:.3f}".format(position - keyframe)
+
+        source = discord.FFmpegPCMAudio(
+            source=entry.filename,
+            before_options=before_options,
+            options=options
+        )
+
+        return HellPCMVolumeTransformer(source, volume=self.volume, start=position)
 
     def skip(self):
         if self.voice_client.is_playing():
@@ -103,6 +152,7 @@ class Player(EventEmitter):
         if self.is_paused:
             self.voice_client.resume()
             self.state = MusicPlayerState.PLAYING
+            self.emit("resume", player=self)
             return
 
         if self.is_paused and not self.voice_client.is_playing():
@@ -116,6 +166,7 @@ class Player(EventEmitter):
         if self.is_playing:
             self.state = MusicPlayerState.PAUSED
             self.voice_client.pause()
+            self.emit("pause", player=self)
 
             return
 
@@ -128,7 +179,7 @@ class Player(EventEmitter):
         # Save the current entry before killing the bot.
         current = self.current_entry
         if current:
-            current.seek = self.progress
+            current.seek = self.position
 
         self.state = MusicPlayerState.DEAD
         self.playlist.clear(kill=True, last_entry=current)
@@ -171,32 +222,18 @@ class Player(EventEmitter):
                 if self.voice_client.is_playing():
                     self.voice_client.stop()
 
-                # Set the player options.
-                options = "-nostdin -ss {seek}".format(
-                    seek=entry.seek
-                )
-
-                self.voice_client.play(discord.FFmpegPCMAudio(
-                    source=entry.filename,
-                    options=options,
-                ),
+                self.voice_client.play(
+                    await self._create_source(entry, entry.seek),
                     # Threadsafe call soon, b/c after will be called from the voice playback thread.
                     after=lambda e: self.loop.call_soon_threadsafe(functools.partial(self.after_callback, e))
                 )
 
-                self.voice_client.source = HellPCMVolumeTransformer(self.voice_client.source)
-                self.voice_client.source.volume = self.volume
-
                 self.state = MusicPlayerState.PLAYING
                 self._current_entry = entry
 
                 if not entry.quiet:
                     self.emit("play", player=self, entry=entry)
 
-                if entry.seek:
-                    self.voice_client.source.frame_count += round(entry.seek / 0.02)
-
-
     @property
     def guild(self) -> Optional[discord.Guild]:
         return self.voice_client.guild
@@ -226,8 +263,9 @@ class Player(EventEmitter):
         return self.state == MusicPlayerState.DEAD
 
     @property
-    def progress(self):
-        if self.voice_client.source:
-            return round(self.voice_client.source.frame_count * 0.02)
+    def position(self) -> float:
+        return getattr(self.voice_client.source, "position", 0.0)
 
-        return 0
+    @property
+    def progress(self) -> int:
+        return round(self.position)
@@ -177,6 +177,7 @@ class Playlist(EventEmitter):
             song_url,
             title,
             destination=dest_url,
+            is_live=self.downloader.is_live(song_url, info),
             **meta
         )
         self._add_entry(entry, prepend=prepend)
@@ -203,7 +204,6 @@ class Playlist(EventEmitter):
             entry.get_ready_future()
 
     async def save_entry(self, entry, prepend=False):
-        await self.redis.hincrby("music:played", entry.url, 1)
         self.bot.stats.count("music_play", url=entry.url)
 
         if prepend:
@@ -0,0 +1,146 @@
+# coding=utf-8
+import asyncio
+import bisect
+import json
+import logging
+import os
+
+from homura.lib.util import md5_string
+
+log = logging.getLogger(__name__)
+
+# Keep one keyframe for every few seconds of audio, that is plenty to land a seek near its target.
+SEEK_INDEX_INTERVAL = 5
+# Songs shorter than this are cheap enough to scan that an index is not worth it.
+SEEK_INDEX_MIN_DURATION = 60 * 10  # 60s * 10m = 10 minutes
+SEEK_INDEX_CACHE_TIME = 60 * 60 * 24 * 7  # 60s * 60m * 24h * 7d = 1 week
+
+
+class SeekIndex(object):
+    """
+    Precomputed keyframe index for files in the audio cache.
+
+    ffmpeg has to guess byte offsets for seeks in containers without a usable index (VBR MP3, cue-less WebM),
+    which makes long mixes stall while it scans. The index is built once with ffprobe and stored in Redis so
+    seeks can jump straight to a known keyframe and only decode the remaining few seconds.
+    """
+
+    def __init__(self, bot):
+        self.bot = bot
+        self._indexes = {}
+        self._building = set()
+
+    @staticmethod
+    def cache_key(filename: str) -> str:
+        return "music:seekindex:" + md5_string(os.path.basename(filename))
+
+    async def get(self, filename: str) -> list:
+        """
+        Gets the keyframe times for a file, loading them from Redis if they are not in memory.
+
+        :param filename: Path of the cached audio file.
+        :return: A sorted list of keyframe times in seconds, empty if the file has not been indexed.
+        """
+        if filename in self._indexes:
+            return self._indexes[filename]
+
+        data = await self.bot.redis.get(self.cache_key(filename))
+        if not data:
+            return []
+
+        try:
+            keyframes = json.loads(data)
+        except json.JSONDecodeError:
+            return []
+
+        self._indexes[filename] = keyframes
+        return keyframes
+
+    async def build(self, filename: str, duration: int=0) -> None:
+        """
+        Builds the keyframe index of a cached file in the background.
+
+        :param filename: Path of the cached audio file.
+        :param duration: Duration of the file in seconds, short files are skipped.
+        """
+        if not filename or not os.path.isfile(filename):
+            return
+
+        if duration and duration < SEEK_INDEX_MIN_DURATION:
+            return
+
+        if filename in self._building:
+            return
+
+        # Runs as a fire-and-forget task, errors end here instead of as an unretrieved task exception.
+        self._building.add(filename)
+        try:
+            if await self.get(filename):
+                return
+
+            keyframes = await self._probe(filename)
+            if not keyframes:
+                return
+
+            self._indexes[filename] = keyframes
+            await self.bot.redis.setex(self.cache_key(filename), SEEK_INDEX_CACHE_TIME, json.dumps(keyframes))
+            log.debug("Indexed %s keyframes for %s", len(keyframes), filename)
+        except Exception:
+            log.exception("Unable to index %s", filename)
+        finally:
+            self._building.discard(filename)
+
+    @staticmethod
+    async def _probe(filename: str) -> list:
+        process = await asyncio.create_subprocess_exec(
+            "ffprobe", "-v", "error",
+            "-select_streams", "a:0",
+            "-show_entries", "packet=pts_time,flags",
+            "-of", "csv=p=0",
+            filename,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL
+        )
+
+        keyframes = []
+        next_bucket = 0.0
+
+        while True:
+            line = await process.stdout.readline()
+            if not line:
+                break
+
+            try:
+                pts_time, flags = line.decode("utf8").strip().split(",", 1)
+                pts_time = float(pts_time)
+            except ValueError:
+                continue
+
+            if "K" not in flags or pts_time < next_bucket:
+                continue
+
+            keyframes.append(pts_time)
+            next_bucket = pts_time + SEEK_INDEX_INTERVAL
+
+        await process.wait()
+
+        if process.returncode != 0:
+            log.warning("ffprobe exited with %s while indexing %s", process.returncode, filename)
+            return []
+
+        return keyframes
+
+    @staticmethod
+    def lookup(keyframes: list, position: float) -> float:
+        """
+        Finds the closest keyframe at or before a position.
+
+        :param keyframes: Sorted keyframe times from `get`.
+        :param position: Seek target in seconds.
+        :return: The keyframe time to seek the input to.
+        """
+        i = bisect.bisect_right(keyframes, position)
+        if i == 0:
+            return 0.0
+
+        return keyframes[i - 1]
@@ -1,13 +1,16 @@
 # coding=utf-8
 import asyncio
+import datetime
 import inspect
 import logging
 import random
+import time
 import traceback
 
 import aiohttp
 from discord import Game
 
+from homura.lib.cluster import HEALTH_INTERVAL, HEALTH_KEY
 from homura.lib.structure import Message
 from homura.plugins.base import PluginBase
 from homura.plugins.command import command
@@ -115,6 +118,53 @@ class OwnerPlugin(PluginBase):
         await asyncio.sleep(sleep_time)
         return Message(f"Slept for {sleep_time} seconds!")
 
+    @command(
+        "owner cluster",
+        permission_name="owner.never.gonna.happen",
+        description="Shows the health of every shard."
+    )
+    async def cluster_health(self):
+        shards = await self.redis.hgetall_asdict(HEALTH_KEY)
+        if not shards:
+            return Message("No shard has reported in yet.")
+
+        lines = []
+        for shard_id, health in sorted(shards.items(), key=lambda shard: int(shard[0])):
+            age = time.time() - health["updated"]
+            lines.append("shard {} (cluster {}, pid {}): {} guilds, {:.0f}ms, {:.0f}s ago{}".format(
+                shard_id,
+                health["cluster"],
+                health["pid"],
+                health["guilds"],
+                health["latency"] * 1000,
+                age,
+                " STALE" if age > HEALTH_INTERVAL * 3 else ""
+            ))
+
+        total = sum(health["guilds"] for health in shards.values())
+        lines.append(f"{total} guilds over {len(shards)} shards")
+
+        return Message("```{}```".format("\n".join(lines)))
+
+    @command(
+        "owner job (.+)",
+        permission_name="owner.never.gonna.happen",
+        description="Shows the last runs of a background job."
+    )
+    async def job_history(self, args):
+        runs = await self.bot.coordinator.history(args[0].strip())
+        if not runs:
+            return Message("That job never ran.")
+
+        lines = ["{} on {}: {:.1f}s{}".format(
+            datetime.datetime.utcfromtimestamp(run["started"]).strftime("%Y-%m-%d %H:%M:%S"),
+            run["node"],
+            run["duration"],
+            "" if run["success"] else " FAILED"
+        ) for run in runs]
+
+        return Message("```{}```".format("\n".join(lines)))
+
     async def on_ready(self):
         status = await self.redis.hget("bot:config", "game")
 
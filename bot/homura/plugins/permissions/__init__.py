@@ -23,14 +23,17 @@ class PermissionsPlugin(PluginBase):
             title="Permissions"
         )
 
-        guild_perms = await permissions.get_perms(guildonly=True)
+        # One request for the whole guild rather than one per channel.
+        snapshot = await permissions.get_snapshot() or {"server": [], "channels": {}}
+
+        guild_perms = snapshot["server"]
         embed.add_field(
             name="Server",
             value="\n".join(guild_perms if guild_perms else ["None!"])
         )
 
         for channel in guild.channels:
-            channel_perms = [x for x in await permissions.get_perms(channel.id) if x not in guild_perms]
+            channel_perms = [x for x in snapshot["channels"].get(channel.id, []) if x not in guild_perms]
             if not channel_perms:
                 continue
 
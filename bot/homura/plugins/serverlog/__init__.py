@@ -1,25 +1,61 @@
 # coding=utf-8
 import datetime
+import hashlib
 import time
 import json
 import logging
 import os
+import re
 from typing import Optional
 
 import aiohttp
+import asyncio_redis
 import discord
 
+from homura.lib.coalesce import MaxHash
 from homura.lib.util import sanitize
 from homura.plugins.base import PluginBase
 from homura.plugins.command import command
 
 log = logging.getLogger(__name__)
 
+# Results shown by the search command.
+SEARCH_RESULTS = 10
+MENTION_REGEX = re.compile(r"<(?:@[!&]?|#)\d+>")
+
+# Approximate number of entries kept in the event stream for the backend's ingest workers.
+STREAM_MAXLEN = 100000
+# asyncio_redis has no XADD.
+XADD_SCRIPT = """
+return redis.call("XADD", KEYS[1], "MAXLEN", "~", ARGV[1], "*", "type", ARGV[2], "payload", ARGV[3])
+"""
+
+# Reconnects within this long of the last guild sync skip it, renames in between are pushed as events anyway.
+GUILD_SYNC_INTERVAL = 60 * 10  # 60s * 10m
+
+# Guild ID to the hash of the names last synced to the backend. Deleting it forces a full sync.
+GUILD_HASHES_KEY = "guilds:synced"
+# Rough cap on the guild and channel names sent in a single bulk request.
+GUILD_SYNC_CHUNK = 2000
+
+# Seconds between writes of the newest message of every channel.
+ARCHIVE_STATE_INTERVAL = 5
+
+# Deleted messages older than this are not shown by undelete.
+UNDELETE_WINDOW = 60 * 60 * 24 * 30  # 60s * 60m * 24h * 30d = 30 days
+
 
 class ServerLogPlugin(PluginBase):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        self.events_url = os.environ.get("BOT_WEB", "http://localhost:5000")
+        self.web_url = os.environ.get("BOT_WEB", "http://localhost:5000")
+        # Events can be served by the asyncio API, disquotes.aio, while search stays on the web backend.
+        self.events_url = os.environ.get("BOT_API", self.web_url)
+        # Events go through a Redis stream to disquotes.ingest when one is configured.
+        self.events_stream = os.environ.get("EVENTS_STREAM", None)
+        self._xadd = None
+        # Newest message ID of every channel, written to Redis every few seconds instead of on every message.
+        self.archive_state = MaxHash(self.bot, "archive:state", ARCHIVE_STATE_INTERVAL)
 
     @command(
         "undelete",
@@ -29,7 +65,7 @@ class ServerLogPlugin(PluginBase):
         usage="undelete"
     )
     async def cmd_undelete(self, message, bot):
-        messages = await self.get_events("delete", message.guild, message.channel)
+        messages = await self.get_events("delete", message.guild, message.channel, since=time.time() - UNDELETE_WINDOW)
         if not messages:
             return await message.channel.send("None")
 
@@ -40,6 +76,42 @@ class ServerLogPlugin(PluginBase):
 
         await message.channel.send(output)
 
+    @command(
+        "search (.+)",
+        permission_name="serverlog.search",
+        description="Searches the archived messages of the server, mention users or channels to only search them.",
+        requires_admin=True,
+        usage="search <query> [@user] [#channel]"
+    )
+    async def cmd_search(self, message, args, user_mentions, channel_mentions):
+        query = MENTION_REGEX.sub("", args[0]).strip()
+        if not query:
+            return await message.channel.send("What should I search for?")
+
+        results = await self.search_messages(
+            message.guild,
+            query,
+            channel=channel_mentions[0] if channel_mentions else None,
+            author=user_mentions[0] if user_mentions else None
+        )
+
+        if results is False:
+            return await message.channel.send("Search is not available right now.")
+
+        if not results:
+            return await message.channel.send("No messages found.")
+
+        output = []
+        for result in results:
+            author = message.guild.get_member(result["author_id"])
+            output.append("__{sender}__ in <#{channel}> - {message}".format(
+                sender=sanitize(author.display_name if author else str(result["author_id"])),
+                channel=result["channel_id"],
+                message=sanitize(result["message"][:150])
+            ))
+
+        await message.channel.send("\n".join(output)[:2000])
+
     @command(
         "archivechannel",
         permission_name="serverlog.archive.channel",
@@ -96,7 +168,7 @@ class ServerLogPlugin(PluginBase):
 
             # Set the latest message if we are on the first message.
             if i == 1:
-                await self.redis.hset("archive:state", channel.id, message.id)
+                self.archive_state.update(channel.id, message.id)
 
             # Upload the buffer every 200 messages.
             if i % 200 == 0:
@@ -115,7 +187,15 @@ class ServerLogPlugin(PluginBase):
             await self.push_event("bulk_channel", data=payload)
 
     async def on_ready(self):
-        await self.add_all_guilds()
+        # Every process of a cluster syncs its own guilds, but only once however many replicas are up.
+        await self.bot.coordinator.run_exclusive(
+            f"add_all_guilds:{self.bot.cluster_id}",
+            self.add_all_guilds,
+            min_interval=GUILD_SYNC_INTERVAL
+        )
+
+    async def on_logout(self):
+        await self.archive_state.flush()
 
     async def on_member_join(self, member):
         await self.log_member(member, True)
@@ -175,7 +255,7 @@ class ServerLogPlugin(PluginBase):
 
     async def on_message(self, message):
         # Set the latest message.
-        await self.redis.hset("archive:state", message.channel.id, message.id)
+        self.archive_state.update(message.channel.id, message.id)
 
         # XXX: Deduplicate this later in the morning.
         payload = []
@@ -236,6 +316,12 @@ class ServerLogPlugin(PluginBase):
             "data": data if data else {}
         }
 
+        if self.events_stream:
+            try:
+                return await self.stream_event(event_type, payload)
+            except asyncio_redis.Error:
+                log.exception("Error adding event to the stream, falling back to HTTP.")
+
         try:
             async with self.bot.aiosession.put(
                 url=self.events_url + "/api/events/" + event_type,
@@ -258,7 +344,20 @@ class ServerLogPlugin(PluginBase):
 
         return True
 
-    async def get_events(self, event_type, guild, channel=None):
+    async def stream_event(self, event_type: str, payload: dict) -> bool:
+        if not self._xadd:
+            self._xadd = await self.redis.register_script(XADD_SCRIPT)
+
+        # Everything is passed as a string, the bot's encoder would tag integers.
+        reply = await self._xadd.run(
+            keys=[self.events_stream],
+            args=[str(STREAM_MAXLEN), event_type, json.dumps(payload)]
+        )
+        await reply.return_value()
+
+        return True
+
+    async def get_events(self, event_type, guild, channel=None, since: Optional[float]=None):
         params = {
             "server": guild.id,
         }
@@ -266,6 +365,9 @@ class ServerLogPlugin(PluginBase):
         if channel:
             params.update({"channel": channel.id})
 
+        if since:
+            params.update({"since": int(since)})
+
         log.debug(event_type)
         log.debug(params)
 
@@ -292,6 +394,40 @@ class ServerLogPlugin(PluginBase):
 
         return True
 
+    async def search_messages(self, guild, query, channel=None, author=None):
+        params = {
+            "q": query,
+            "server": guild.id,
+            "limit": SEARCH_RESULTS
+        }
+
+        if channel:
+            params.update({"channel": channel.id})
+
+        if author:
+            params.update({"author": author.id})
+
+        try:
+            async with self.bot.aiosession.get(
+                url=self.web_url + "/api/messages/search",
+                params=params
+            ) as response:
+                try:
+                    reply = await response.json()
+                    if response.status in (400, 500):
+                        log.error("Error searching messages.")
+                        log.error(reply)
+                        return False
+
+                    return reply.get("messages", [])
+                except ValueError:
+                    log.error("Error parsing JSON.")
+                    log.error(await response.text())
+                    return False
+
+        except aiohttp.ClientError:
+            return False
+
     async def log_member(self, member, joining):
         action = "join" if joining else "leave"
 
@@ -300,19 +436,50 @@ class ServerLogPlugin(PluginBase):
             "name": member.name
         })
 
+    @staticmethod
+    def dump_guild(guild: discord.Guild) -> dict:
+        return {
+            "name": guild.name,
+            "channels": {str(channel.id): channel.name for channel in guild.channels}
+        }
+
     async def add_all_guilds(self):
-        payload = {}
+        """
+        Sends the names of the guilds and channels that changed since they were last synced.
+        """
+        guilds = {str(guild.id): self.dump_guild(guild) for guild in self.bot.guilds}
+        if not guilds:
+            return
 
-        for guild in self.bot.guilds:
-            payload[str(guild.id)] = {
-                "name": guild.name,
-                "channels": {}
-            }
+        hashes = {
+            guild_id: hashlib.sha1(json.dumps(guild, sort_keys=True).encode("utf-8")).hexdigest()
+            for guild_id, guild in guilds.items()
+        }
+        synced = await self.redis.hmget_aslist(GUILD_HASHES_KEY, list(hashes))
+        changed = [guild_id for guild_id, synced_hash in zip(hashes, synced) if hashes[guild_id] != synced_hash]
+
+        log.info("Syncing %s of %s guilds.", len(changed), len(guilds))
+        self.bot.stats.count("guild_sync", count=float(len(changed)))
+
+        chunk = {}
+        size = 0
+
+        for guild_id in changed:
+            chunk[guild_id] = guilds[guild_id]
+            size += 1 + len(guilds[guild_id]["channels"])
+
+            if size >= GUILD_SYNC_CHUNK:
+                await self.sync_guilds(chunk, hashes)
+                chunk = {}
+                size = 0
 
-            for channel in guild.channels:
-                payload[str(guild.id)]["channels"][str(channel.id)] = channel.name
+        if chunk:
+            await self.sync_guilds(chunk, hashes)
 
-        await self.push_event("bulk", data=payload)
+    async def sync_guilds(self, chunk: dict, hashes: dict):
+        # Hashes are only stored once the backend has the names, failed chunks are sent again on the next sync.
+        if await self.push_event("bulk", data=chunk):
+            await self.redis.hmset(GUILD_HASHES_KEY, {guild_id: hashes[guild_id] for guild_id in chunk})
 
     def dump_attachments(self, message: discord.Message):
         if not message.attachments:
@@ -0,0 +1,65 @@
+import asyncio
+
+import pytest
+
+from homura.lib.coalesce import MaxHash
+
+from .. import create_unique_id
+
+
+@pytest.mark.asyncio
+async def test_maxhash_coalesces_writes(bot):
+    key = f"test:maxhash:{create_unique_id()}"
+    state = MaxHash(bot, key, interval=0.05)
+
+    state.update(1, 10)
+    state.update(1, 30)
+    state.update(1, 20)
+    state.update(2, 5)
+
+    assert len(state) == 2
+    assert state.dirty[1] == 30
+    assert await bot.redis.hget(key, 1) is None
+
+    await asyncio.sleep(0.1)
+    assert len(state) == 0
+    assert await bot.redis.hget(key, 1) == 30
+    assert await bot.redis.hget(key, 2) == 5
+
+    await bot.redis.delete([key])
+
+
+@pytest.mark.asyncio
+async def test_maxhash_flush(bot):
+    key = f"test:maxhash:{create_unique_id()}"
+    state = MaxHash(bot, key, interval=60)
+
+    state.update(1, 10)
+    await state.flush()
+
+    assert await bot.redis.hget(key, 1) == 10
+
+    await bot.redis.delete([key])
+
+
+@pytest.mark.asyncio
+async def test_maxhash_out_of_order_across_flush(bot):
+    key = f"test:maxhash:{create_unique_id()}"
+    state = MaxHash(bot, key, interval=60)
+    other = MaxHash(bot, key, interval=60)
+
+    state.update(1, 445566778899001122)
+    state.update(2, 9)
+    await state.flush()
+
+    # A late smaller value, then one from another process.
+    state.update(1, 445566778899001121)
+    other.update(1, 99)
+    state.update(2, 10)
+    await state.flush()
+    await other.flush()
+
+    assert await bot.redis.hget(key, 1) == 445566778899001122
+    assert await bot.redis.hget(key, 2) == 10
+
+    await bot.redis.delete([key])
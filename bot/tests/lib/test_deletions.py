@@ -0,0 +1,112 @@
+import asyncio
+import types
+
+import discord
+import pytest
+
+from homura.lib import deletions
+from homura.lib.deletions import DeletionScheduler
+from homura.lib.util import Dummy
+
+
+class FakeRedis(object):
+    def __init__(self):
+        self.zset = {}
+
+    async def zadd(self, key, values):
+        self.zset.update(values)
+
+    async def zrem(self, key, members):
+        for member in members:
+            self.zset.pop(member, None)
+
+
+class FakeHTTP(object):
+    def __init__(self, bulk_error=None):
+        self.bulk_error = bulk_error
+        self.bulk = []
+        self.single = []
+
+    async def delete_messages(self, channel_id, message_ids):
+        if self.bulk_error:
+            raise self.bulk_error
+        self.bulk.append(list(message_ids))
+
+    async def delete_message(self, channel_id, message_id):
+        self.single.append(message_id)
+
+
+class FakeBot(object):
+    def __init__(self, http):
+        self.loop = asyncio.get_event_loop()
+        self.redis = FakeRedis()
+        self.http = http
+        self.stats = Dummy()
+        self.ignored = set()
+
+    def get_channel(self, channel_id):
+        return discord.Object(id=channel_id)
+
+    def ignore_deletes(self, guild_id, ids):
+        self.ignored.update(ids)
+
+
+def make_message(message_id, channel_id=10, guild_id=1):
+    message = discord.Object(id=message_id)
+    message.channel = discord.Object(id=channel_id)
+    message.guild = discord.Object(id=guild_id)
+
+    return message
+
+
+async def schedule_all(scheduler, monkeypatch, messages, delay=5):
+    # Freeze the clock so every message is due in the same second.
+    monkeypatch.setattr(deletions.time, "time", lambda: 1000.0)
+
+    for message in messages:
+        await scheduler.schedule(message, delay)
+
+
+@pytest.mark.asyncio
+async def test_deletions_grouped_per_channel(monkeypatch):
+    bot = FakeBot(FakeHTTP())
+    scheduler = DeletionScheduler(bot)
+
+    await schedule_all(scheduler, monkeypatch, [make_message(1), make_message(2), make_message(3, channel_id=20)])
+    assert len(bot.redis.zset) == 3
+    assert sorted(scheduler.pending) == [(10, 1005), (20, 1005)]
+
+    await scheduler.run((10, 1005))
+    await scheduler.run((20, 1005))
+
+    assert bot.http.bulk == [[1, 2]]
+    assert bot.http.single == [3]
+    assert bot.ignored == {1, 2, 3}
+    assert not bot.redis.zset
+    assert not scheduler.pending
+
+
+@pytest.mark.asyncio
+async def test_deletions_chunked(monkeypatch):
+    bot = FakeBot(FakeHTTP())
+    scheduler = DeletionScheduler(bot)
+
+    await schedule_all(scheduler, monkeypatch, [make_message(i) for i in range(1, 251)])
+    await scheduler.run((10, 1005))
+
+    assert [len(chunk) for chunk in bot.http.bulk] == [100, 100, 50]
+    assert not bot.http.single
+
+
+@pytest.mark.asyncio
+async def test_deletions_fall_back_to_single(monkeypatch):
+    forbidden = discord.Forbidden(types.SimpleNamespace(status=403, reason="Forbidden"), "Missing Permissions")
+    bot = FakeBot(FakeHTTP(bulk_error=forbidden))
+    scheduler = DeletionScheduler(bot)
+
+    await schedule_all(scheduler, monkeypatch, [make_message(1), make_message(2)])
+    await scheduler.run((10, 1005))
+
+    assert not bot.http.bulk
+    assert bot.http.single == [1, 2]
+    assert not bot.redis.zset
@@ -0,0 +1,64 @@
+import discord
+
+from homura.lib.logqueue import MAX_EMBED_LENGTH, MAX_EMBEDS, ChannelQueue, embed_length
+
+
+def test_take_packs_embeds():
+    queue = ChannelQueue()
+    for i in range(MAX_EMBEDS + 3):
+        queue.routine.append(discord.Embed(title=f"routine {i}"))
+
+    content, embeds = queue.take()
+    assert not content
+    assert len(embeds) == MAX_EMBEDS
+    assert len(queue) == 3
+
+
+def test_take_priority_first():
+    queue = ChannelQueue()
+    queue.routine.append(discord.Embed(title="routine"))
+    for i in range(MAX_EMBEDS):
+        queue.priority.append(discord.Embed(title=f"priority {i}"))
+
+    _, embeds = queue.take()
+    assert [embed.title for embed in embeds] == [f"priority {i}" for i in range(MAX_EMBEDS)]
+
+    _, embeds = queue.take()
+    assert [embed.title for embed in embeds] == ["routine"]
+
+
+def test_take_joins_lines():
+    queue = ChannelQueue()
+    queue.routine.extend(["a" * 1500, "b" * 400, "c" * 400])
+
+    content, _ = queue.take()
+    assert content == "a" * 1500 + "\n" + "b" * 400
+
+    content, _ = queue.take()
+    assert content == "c" * 400
+
+
+def test_take_splits_large_embeds():
+    queue = ChannelQueue()
+    for i in range(5):
+        queue.routine.append(discord.Embed(title=f"edit {i}", description="x" * 1800))
+
+    batches = []
+    while queue:
+        _, embeds = queue.take()
+        batches.append([embed.title for embed in embeds])
+        assert sum(embed_length(embed) for embed in embeds) <= MAX_EMBED_LENGTH
+
+    assert batches == [["edit 0", "edit 1", "edit 2"], ["edit 3", "edit 4"]]
+
+
+def test_take_keeps_routine_behind_priority():
+    queue = ChannelQueue()
+    queue.priority.extend(["a" * 1500, "b" * 1000])
+    queue.routine.append("c" * 100)
+
+    content, _ = queue.take()
+    assert content == "a" * 1500
+
+    content, _ = queue.take()
+    assert content == "b" * 1000 + "\n" + "c" * 100
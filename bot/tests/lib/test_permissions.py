@@ -0,0 +1,62 @@
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from homura.lib import permissions
+from homura.lib.permissions import PermissionSet, Permissions, compile_permissions
+
+
+@pytest.fixture
+def guild_permissions(monkeypatch):
+    monkeypatch.setattr(permissions, "_snapshots", {
+        1: {
+            "etag": '"3"',
+            "fetched": time.time(),
+            "server": ["music"],
+            "channels": {10: ["-music.play", "fun"]}
+        }
+    })
+
+    message = SimpleNamespace(guild=SimpleNamespace(id=1), channel=SimpleNamespace(id=10))
+    return Permissions(None, message)
+
+
+@pytest.mark.asyncio
+async def test_perms_from_snapshot(guild_permissions):
+    assert await guild_permissions.get_perms() == ["music", "-music.play", "fun"]
+    assert await guild_permissions.get_perms(20) == ["music"]
+    assert await guild_permissions.get_perms(guildonly=True) == ["music"]
+
+
+@pytest.mark.asyncio
+async def test_perms_checks(guild_permissions):
+    await guild_permissions.load_perms()
+
+    assert guild_permissions.can("fun.cat")
+    assert guild_permissions.can("music.skip")
+    assert not guild_permissions.can("music.play")
+    assert not guild_permissions.can("moderation")
+
+
+def test_permission_set_negation_wins():
+    perms = PermissionSet(["music", "-music.queue", "fun.cat"])
+
+    assert perms.check("music.play")
+    assert not perms.check("music.queue.clear")
+    assert not perms.check("music.queue")
+    assert perms.check("fun.cat.big")
+    assert not perms.check("fun")
+    assert perms.check("fun", blacklist_only=True)
+    assert not perms.check("music.queue", blacklist_only=True)
+
+
+def test_permission_set_wildcard():
+    perms = PermissionSet(["*", "-music"])
+
+    assert perms.check("music.play")
+    assert perms.check("anything")
+
+
+def test_compiled_sets_are_shared():
+    assert compile_permissions(("music", "-fun")) is compile_permissions(("music", "-fun"))
@@ -0,0 +1,26 @@
+from homura.lib import recent
+from homura.lib.recent import RecentSet
+
+
+def test_recent_set_expires(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(recent.time, "monotonic", lambda: now[0])
+
+    deleted = RecentSet(window=120, buckets=4)
+    deleted.add([1, 2])
+
+    now[0] += 60
+    deleted.add([3])
+    assert 1 in deleted
+    assert 3 in deleted
+    assert 4 not in deleted
+    assert len(deleted) == 3
+
+    # Members are kept at least the whole window, and at most one bucket longer.
+    now[0] += 90
+    assert 1 not in deleted
+    assert 3 in deleted
+
+    now[0] += 150
+    assert 3 not in deleted
+    assert len(deleted) == 0
@@ -0,0 +1,52 @@
+import discord
+
+from homura.lib.roles import RoleIndex
+
+from .. import create_unique_id
+
+
+def make_role(name):
+    role = discord.Object(id=create_unique_id())
+    role.name = name
+
+    return role
+
+
+def test_role_index_lookups(guild):
+    muted, admin, shadow = make_role("Muted"), make_role(" Admin "), make_role("admin")
+    guild.roles = [muted, admin, shadow]
+
+    roles = RoleIndex()
+    assert roles.get(guild, "muted") is muted
+    assert roles.get(guild, muted.id) is muted
+    assert roles.get(guild, str(shadow.id)) is shadow
+    # The first of the roles sharing a name wins.
+    assert roles.get(guild, "ADMIN") is admin
+    assert roles.get(guild, "missing") is None
+
+
+def test_role_index_invalidate(guild):
+    guild.roles = []
+
+    roles = RoleIndex()
+    assert roles.get(guild, "new") is None
+
+    new = make_role("New")
+    guild.roles = [new]
+    assert roles.get(guild, "new") is None
+
+    roles.invalidate(guild)
+    assert roles.get(guild, "new") is new
+
+
+def test_role_index_clear(guild):
+    old = make_role("Role")
+    guild.roles = [old]
+
+    roles = RoleIndex()
+    assert roles.get(guild, "role") is old
+
+    new = make_role("Role")
+    guild.roles = [new]
+    roles.clear()
+    assert roles.get(guild, "role") is new
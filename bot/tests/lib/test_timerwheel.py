@@ -0,0 +1,50 @@
+import asyncio
+
+import pytest
+
+from homura.lib.timerwheel import TimerWheel
+
+
+@pytest.mark.asyncio
+async def test_timer_fires_once():
+    fired = []
+    wheel = TimerWheel(asyncio.get_event_loop(), tick=0.01, slots=8)
+
+    wheel.schedule("a", 0.03, lambda: fired.append("a"))
+    assert "a" in wheel
+
+    await asyncio.sleep(0.1)
+    assert fired == ["a"]
+    assert len(wheel) == 0
+
+
+@pytest.mark.asyncio
+async def test_timer_cancel_and_reschedule():
+    fired = []
+    wheel = TimerWheel(asyncio.get_event_loop(), tick=0.01, slots=8)
+
+    wheel.schedule("a", 0.02, lambda: fired.append("first"))
+    wheel.schedule("a", 0.04, lambda: fired.append("second"))
+    wheel.schedule("b", 0.02, lambda: fired.append("b"))
+    assert wheel.cancel("b")
+    assert not wheel.cancel("b")
+
+    await asyncio.sleep(0.1)
+    assert fired == ["second"]
+
+
+@pytest.mark.asyncio
+async def test_timer_longer_than_wheel():
+    fired = []
+    wheel = TimerWheel(asyncio.get_event_loop(), tick=0.01, slots=4)
+
+    async def callback():
+        fired.append("late")
+
+    wheel.schedule("late", 0.1, callback)
+
+    await asyncio.sleep(0.05)
+    assert not fired
+
+    await asyncio.sleep(0.1)
+    assert fired == ["late"]
@@ -0,0 +1,116 @@
+import asyncio
+import datetime
+import types
+
+import pytest
+
+from homura.lib.structure import CommandError
+from homura.plugins.moderation import purge
+from homura.plugins.moderation.purge import PurgeEngine, parse_options
+
+
+def make_message(message_id, author_id=1, bot=False, content="", attachments=(), age=datetime.timedelta()):
+    return types.SimpleNamespace(
+        id=message_id,
+        author=types.SimpleNamespace(id=author_id, bot=bot),
+        content=content,
+        attachments=list(attachments),
+        created_at=datetime.datetime.utcnow() - age
+    )
+
+
+class FakeChannel(object):
+    active = 0
+    most_active = 0
+
+    def __init__(self, channel_id, messages):
+        self.id = channel_id
+        # Newest first, like Discord returns them.
+        self.messages = messages
+
+    async def history(self, limit=None):
+        FakeChannel.active += 1
+        FakeChannel.most_active = max(FakeChannel.most_active, FakeChannel.active)
+
+        try:
+            for message in self.messages[:limit]:
+                await asyncio.sleep(0)
+                yield message
+        finally:
+            FakeChannel.active -= 1
+
+
+class FakeBot(object):
+    def __init__(self):
+        self.single = []
+        self.bulk = []
+
+    async def delete_message(self, message):
+        self.single.append(message.id)
+
+    async def delete_messages(self, messages):
+        self.bulk.append([message.id for message in messages])
+
+
+def test_parse_options_targets():
+    predicate, after = parse_options(" <@2> bots match:spam link", [2])
+    assert after is None
+
+    assert predicate(make_message(1, author_id=2))
+    assert predicate(make_message(1, bot=True))
+    assert predicate(make_message(1, content="free SPAM LINK here"))
+    assert not predicate(make_message(1, content="hello"))
+
+    predicate, _ = parse_options(" attachments")
+    assert predicate(make_message(1, attachments=["a.png"]))
+    assert not predicate(make_message(1))
+
+    assert parse_options(" ") == (None, None)
+
+
+def test_parse_options_hours():
+    predicate, after = parse_options(" bots hours:2")
+    assert datetime.datetime.utcnow() - after >= datetime.timedelta(hours=2)
+
+    assert predicate(make_message(1, bot=True, age=datetime.timedelta(hours=1)))
+    assert not predicate(make_message(1, bot=True, age=datetime.timedelta(hours=3)))
+
+
+def test_parse_options_invalid_regex():
+    with pytest.raises(CommandError):
+        parse_options(" match:[unclosed")
+
+
+@pytest.mark.asyncio
+async def test_engine_concurrent_purge():
+    FakeChannel.active = FakeChannel.most_active = 0
+
+    channels = [
+        FakeChannel(i, [make_message(i * 1000 + j, author_id=j % 2) for j in range(10)])
+        for i in range(6)
+    ]
+    # Too old for a bulk delete.
+    channels[0].messages.append(make_message(999, author_id=1, age=datetime.timedelta(days=20)))
+
+    bot = FakeBot()
+    engine = await PurgeEngine(bot, purge.by_users([1]), concurrency=2).run(channels)
+
+    assert FakeChannel.most_active == 2
+    assert engine.channels_done == 6
+    assert engine.scanned == 61
+    assert engine.deleted == 31
+    assert bot.single == [999]
+    assert sorted(len(ids) for ids in bot.bulk) == [5] * 6
+
+
+@pytest.mark.asyncio
+async def test_engine_scans_newest_first():
+    messages = [make_message(i, age=datetime.timedelta(hours=i)) for i in range(10)]
+    after = datetime.datetime.utcnow() - datetime.timedelta(hours=3, minutes=30)
+
+    bot = FakeBot()
+    engine = await PurgeEngine(bot, purge.by_users([1]), limit=5, after=after).run([FakeChannel(1, messages)])
+
+    # The newest messages are scanned and the scan stops at the cutoff.
+    assert engine.scanned == 4
+    assert bot.bulk == [[0, 1, 2, 3]]
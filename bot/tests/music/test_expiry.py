@@ -0,0 +1,80 @@
+import asyncio
+import json
+import types
+import urllib.parse
+
+import pytest
+
+from homura.plugins.music import expiry
+from homura.plugins.music.expiry import MediaRefresher, get_expiry, get_info_expiry
+
+
+def test_googlevideo_query():
+    url = "https://r4---sn-a5mekned.googlevideo.com/videoplayback?expire=1530000000&ei=abc&mime=audio%2Fwebm"
+    assert get_expiry(url) == 1530000000
+
+
+def test_googlevideo_path():
+    url = "https://manifest.googlevideo.com/api/manifest/dash/expire/1530000123/ei/abc/file/index.m3u8"
+    assert get_expiry(url) == 1530000123
+
+
+def test_s3_presigned():
+    url = "https://bucket.s3.amazonaws.com/a.mp3?X-Amz-Date=20180101T000000Z&X-Amz-Expires=3600"
+    assert get_expiry(url) == 1514764800 + 3600
+
+
+def test_twitch_token():
+    token = urllib.parse.quote(json.dumps({"channel": "test", "expires": 1530000456}))
+    url = f"https://usher.ttvnw.net/api/channel/hls/test.m3u8?token={token}&sig=abc"
+    assert get_expiry(url) == 1530000456
+
+
+def test_unsigned_urls():
+    assert get_expiry("http://radio.example.com:8000/stream.mp3") is None
+    assert get_expiry(None) is None
+
+
+def test_info_expiry_takes_earliest():
+    info = {
+        "url": "https://a.googlevideo.com/videoplayback?expire=200",
+        "formats": [
+            {"url": "https://a.googlevideo.com/videoplayback?expire=100"},
+            {"url": "http://radio.example.com/stream"},
+        ]
+    }
+    assert get_info_expiry(info) == 100
+    assert get_info_expiry({}) is None
+
+
+class FakeEntry(object):
+    def __init__(self, url, error=None):
+        self.url = url
+        self.error = error
+        self.expires = 0
+        self.refreshed = 0
+
+    def needs_refresh(self, margin=0):
+        return True
+
+    async def refresh(self):
+        self.refreshed += 1
+        if self.error:
+            raise self.error
+
+
+@pytest.mark.asyncio
+async def test_refresher_survives_errors(monkeypatch):
+    broken = FakeEntry("http://broken", KeyError("url"))
+    healthy = FakeEntry("http://healthy")
+    player = types.SimpleNamespace(playlist=types.SimpleNamespace(entries=[broken, healthy]))
+
+    monkeypatch.setattr(expiry, "REFRESH_INTERVAL", 0.01)
+    task = asyncio.ensure_future(MediaRefresher(types.SimpleNamespace(players={1: player})).run())
+
+    await asyncio.sleep(0.1)
+    assert not task.done()
+    assert broken.refreshed > 1
+    assert healthy.refreshed == broken.refreshed
+
+    task.cancel()
@@ -0,0 +1,59 @@
+import collections
+import random
+import types
+
+import pytest
+
+from homura.plugins.music.history import GLOBAL_SCOPE, META_KEY, PlayHistory, WeightedSampler
+
+from .. import create_unique_id
+
+
+def test_sampler_empty():
+    assert WeightedSampler().sample() is None
+
+
+def test_sampler_totals():
+    sampler = WeightedSampler()
+
+    for i in range(37):
+        sampler.increment(f"song{i}", i % 5)
+    sampler.increment("song3", 100)
+
+    assert len(sampler) == 37
+    assert sampler.total == sum(i % 5 for i in range(37)) + 100
+
+
+def test_sampler_is_weighted():
+    sampler = WeightedSampler()
+    sampler.increment("often", 9)
+    sampler.increment("rarely", 1)
+    sampler.increment("never", 0)
+
+    rng = random.Random(4)
+    picks = collections.Counter(sampler.sample(rng) for _ in range(10000))
+
+    assert "never" not in picks
+    assert 8500 < picks["often"] < 9500
+
+
+@pytest.mark.asyncio
+async def test_history_record_and_top(bot, guild):
+    history = PlayHistory(bot)
+    often = types.SimpleNamespace(url=f"test:{create_unique_id()}", title="Often", duration=60)
+    rarely = types.SimpleNamespace(url=f"test:{create_unique_id()}", title="Rarely", duration=None)
+
+    for entry in (often, often, rarely):
+        await history.record(guild, entry)
+
+    top = await history.top(guild)
+    assert [song["url"] for song in top] == [often.url, rarely.url]
+    assert [song["plays"] for song in top] == [2, 1]
+    assert top[0]["title"] == "Often"
+    assert top[1]["duration"] == 0
+    assert all(song["last_played"] for song in top)
+
+    await bot.redis.delete([history.plays_key(str(guild.id)), history.last_played_key(str(guild.id))])
+    for key in (history.plays_key(GLOBAL_SCOPE), history.last_played_key(GLOBAL_SCOPE)):
+        await bot.redis.zrem(key, [often.url, rarely.url])
+    await bot.redis.hdel(META_KEY, [often.url, rarely.url])
@@ -0,0 +1,44 @@
+import io
+import time
+
+import discord
+
+from homura.plugins.music import hub
+from homura.plugins.music.hub import RING_SIZE, StreamHub
+
+FRAME_SIZE = discord.opus.Encoder.FRAME_SIZE
+
+
+class FakeProcess(object):
+    def __init__(self, frames):
+        self.stdout = io.BytesIO(b"".join(frames))
+
+    def wait(self):
+        return 0
+
+    def kill(self):
+        pass
+
+    def communicate(self):
+        return b"", b""
+
+
+def test_slow_listener_gets_every_frame(monkeypatch):
+    # Enough frames to fill a listener's buffer twice over, all available to the decode at once.
+    frames = [i.to_bytes(4, "big") * (FRAME_SIZE // 4) for i in range(RING_SIZE * 2)]
+    monkeypatch.setattr(hub.subprocess, "Popen", lambda *args, **kwargs: FakeProcess(frames))
+
+    listener = StreamHub().subscribe("key", "http://example.com/stream")
+
+    received = []
+    while True:
+        frame = listener.read()
+        if not frame:
+            break
+
+        received.append(frame)
+        if len(received) % 50 == 0:
+            time.sleep(0.05)
+
+    assert received == frames
+    assert not listener.stalled
@@ -0,0 +1,40 @@
+import types
+
+import pytest
+
+from homura.plugins.music.seekindex import SeekIndex
+
+
+def test_lookup_picks_previous_keyframe():
+    keyframes = [0.0, 5.02, 10.04, 15.01]
+
+    assert SeekIndex.lookup(keyframes, 0) == 0.0
+    assert SeekIndex.lookup(keyframes, 7.5) == 5.02
+    assert SeekIndex.lookup(keyframes, 10.04) == 10.04
+    assert SeekIndex.lookup(keyframes, 600) == 15.01
+
+
+def test_lookup_before_first_keyframe():
+    assert SeekIndex.lookup([1.5, 6.5], 1.0) == 0.0
+    assert SeekIndex.lookup([], 30) == 0.0
+
+
+class FakeRedis(object):
+    async def get(self, key):
+        return None
+
+
+@pytest.mark.asyncio
+async def test_build_logs_probe_errors(tmp_path, monkeypatch):
+    filename = tmp_path / "song.webm"
+    filename.write_bytes(b"")
+
+    async def probe(filename):
+        raise FileNotFoundError("ffprobe")
+
+    index = SeekIndex(types.SimpleNamespace(redis=FakeRedis()))
+    monkeypatch.setattr(index, "_probe", probe)
+
+    await index.build(str(filename))
+    assert await index.get(str(filename)) == []
+    assert not index._building